@@ -1,366 +1,186 @@
-import streamlit as st
+import io
+import os
 import re
-import zlib
-import base64
+import time
+import urllib.error
 
-# --------------------------
-# PlantUML URL Generator
-# --------------------------
-def get_plantuml_image_url(uml_code, server="http://www.plantuml.com/plantuml/png/"):
-    def encode_plantuml(text):
-        data = text.encode('utf-8')
-        compressed = zlib.compress(data)[2:-4]  # strip zlib header/footer
-        return encode_base64(compressed)
-
-    def encode_base64(data):
-        alphabet = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-_'
-        result = ''
-        i = 0
-        while i < len(data):
-            b1 = data[i]
-            b2 = data[i + 1] if i + 1 < len(data) else 0
-            b3 = data[i + 2] if i + 2 < len(data) else 0
-            result += alphabet[b1 >> 2]
-            result += alphabet[((b1 & 0x3) << 4) | (b2 >> 4)]
-            result += alphabet[((b2 & 0xF) << 2) | (b3 >> 6)]
-            result += alphabet[b3 & 0x3F]
-            i += 3
-        return result
-
-    encoded = encode_plantuml(uml_code)
-    return server + encoded
+import altair as alt
+import pandas as pd
+import streamlit as st
 
-# --------------------------
-# Enhanced Log Parsers for QDMA Format
-# --------------------------
+from modules.log_formats import detect_format, parse_events, regex_format, MIXED_FORMAT
+from modules.log_io import (
+    iter_log_lines,
+    iter_log_file_lines,
+    sample_stream_lines,
+    sample_file_lines,
+    detect_compression,
+    detect_from_head,
+    open_decompressed,
+    COMPRESSED_EXTENSIONS,
+)
+from modules.log_cache import LRUCache, stream_digest, text_digest, file_fingerprint
+from modules.log_table import events_to_frame, frame_filter_options
+from modules.log_index import EventIndex, TimeIndex
+from modules.log_parallel import parse_qdma_file_parallel
+from modules.call_tree import build_call_trees, call_tree_rows, call_trees_json
+from modules.latency import latency_profile
+from modules.flame_graph import (
+    folded_stacks,
+    folded_text,
+    flame_layout,
+    WEIGHT_COUNT,
+    WEIGHT_DURATION,
+)
+from modules.log_diagrams import (
+    get_plantuml_image_url,
+    fetch_plantuml_image,
+    diagram_to_puml,
+    paginate_diagram,
+    DEFAULT_PAGE_STEPS,
+)
+from modules.live_tail import LiveDiagram
+from modules.log_merge import merge_logs, merged_format
+from modules.log_store import (
+    store_kind,
+    save_event_table,
+    load_event_table,
+    frame_to_events,
+    STORE_ARROW,
+    STORE_EXTENSIONS,
+    STORE_PARQUET,
+)
+from modules.diagram_sampling import (
+    build_bounded_diagram,
+    SAMPLE_FIRST_LAST,
+    SAMPLE_RESERVOIR,
+    SAMPLE_STRIDE,
+)
+from modules.diagram_cache import DiagramCache, diagram_key, normalize_filters
+from modules.svg_render import render_svg
 
-def parse_qdma_log_line(line):
-    """Parse QDMA log line to extract function name and action type"""
-    # Pattern for QDMA log format: [timestamp] module:function: ----- QDMA entering/exiting the function_name function at path [Thread ID: xxx] -----
-    qdma_pattern = r'\[[\d.]+\]\s+(\w+):(\w+):\s+----- QDMA (entering|exiting) the (\w+) function at.*?\[Thread ID: (\d+)\]'
-    
-    # Alternative pattern for simpler QDMA logs
-    simple_pattern = r'\[[\d.]+\]\s+(\w+):(\w+):\s+(.+)$'
-    
-    # Command pattern
-    command_pattern = r'\[[\d.]+\]\s+Command:\s+(.+)$'
-    
-    match = re.search(qdma_pattern, line)
-    if match:
-        module, caller_func, action, func_name, thread_id = match.groups()
-        return {
-            'module': module,
-            'caller_func': caller_func,
-            'function': func_name,
-            'action': action,
-            'thread_id': thread_id,
-            'full_line': line.strip()
-        }
-    
-    match = re.search(simple_pattern, line)
-    if match:
-        module, func_name, message = match.groups()
-        return {
-            'module': module,
-            'caller_func': func_name,
-            'function': func_name,
-            'action': 'info',
-            'thread_id': None,
-            'message': message,
-            'full_line': line.strip()
-        }
-    
-    match = re.search(command_pattern, line)
-    if match:
-        command = match.group(1)
-        return {
-            'module': 'system',
-            'caller_func': 'command',
-            'function': 'command',
-            'action': 'command',
-            'thread_id': None,
-            'message': command,
-            'full_line': line.strip()
-        }
-    
-    return None
+# Parsed logs kept per session, bounded by entry count and total event count
+PARSE_CACHE_ENTRIES = 4
+PARSE_CACHE_MAX_EVENTS = 20_000_000
 
-# def parse_qdma_log_to_puml(log_lines):
-#     """Generate PlantUML sequence diagram for QDMA logs"""
-#     plantuml_lines = ["@startuml"]
-#     plantuml_lines.append("title QDMA Driver Function Call Sequence")
-#     plantuml_lines.append("participant User")
-    
-#     participants = set(["User"])
-#     call_stack = []
-    
-#     for line in log_lines:
-#         parsed = parse_qdma_log_line(line)
-#         if not parsed:
-#             continue
-            
-#         func_name = parsed['function']
-#         action = parsed['action']
-#         module = parsed['module']
-        
-#         # Add participant if new
-#         if func_name not in participants:
-#             plantuml_lines.append(f"participant {func_name}")
-#             participants.add(func_name)
-        
-#         if action == 'entering':
-#             if call_stack:
-#                 caller = call_stack[-1]
-#                 plantuml_lines.append(f"{caller}->{func_name}: call")
-#             else:
-#                 plantuml_lines.append(f"User->{func_name}: call")
-#             call_stack.append(func_name)
-            
-#         elif action == 'exiting':
-#             if call_stack and call_stack[-1] == func_name:
-#                 call_stack.pop()
-#                 if call_stack:
-#                     caller = call_stack[-1]
-#                     plantuml_lines.append(f"{func_name}-->{caller}: return")
-#                 else:
-#                     plantuml_lines.append(f"{func_name}-->User: return")
-                    
-#         elif action == 'command':
-#             plantuml_lines.append(f"note over User: {parsed.get('message', '')}")
-            
-#         elif action == 'info':
-#             if parsed.get('message'):
-#                 plantuml_lines.append(f"note right of {func_name}: {parsed['message'][:50]}...")
-    
-#     plantuml_lines.append("@enduml")
-#     return "\n".join(plantuml_lines)
+RENDERER_PLANTUML = "PlantUML server (PNG)"
+RENDERER_SVG = "Offline SVG"
 
+# The app fetches PlantUML images itself so they can be cached; an unreachable server (air-gapped
+# host) costs at most one short timeout, after which pages are linked for the browser to fetch
+PLANTUML_FETCH_TIMEOUT = 3
+PLANTUML_RETRY_AFTER = 300  # seconds before the app tries the server again
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
 
-def parse_qdma_log_to_puml(log_lines):
-    """Generate PlantUML sequence diagram for QDMA logs"""
-    plantuml_lines = ["@startuml"]
-    plantuml_lines.append("title QDMA Driver Function Call Sequence")
-    plantuml_lines.append("participant User")
-    
-    participants = set(["User"])
-    call_stack = []
-    
-    for line in log_lines:
-        parsed = parse_qdma_log_line(line)
-        if not parsed:
-            continue
-            
-        func_name = parsed['function']
-        action = parsed['action']
-        module = parsed['module']
-        
-        # Add participant if new
-        if func_name not in participants:
-            plantuml_lines.append(f"participant {func_name}")
-            participants.add(func_name)
-        
-        if action == 'entering':
-            if call_stack:
-                caller = call_stack[-1]
-                # FIX: Used the dynamic 'action' variable instead of hardcoded "call"
-                plantuml_lines.append(f"{caller}->{func_name}: {action}")
-            else:
-                # FIX: Used the dynamic 'action' variable instead of hardcoded "call"
-                plantuml_lines.append(f"User->{func_name}: {action}")
-            call_stack.append(func_name)
-            
-        elif action == 'exiting':
-            if call_stack and call_stack[-1] == func_name:
-                call_stack.pop()
-                if call_stack:
-                    caller = call_stack[-1]
-                    # FIX: Used the dynamic 'action' variable instead of hardcoded "return"
-                    plantuml_lines.append(f"{func_name}-->{caller}: {action}")
-                else:
-                    # FIX: Used the dynamic 'action' variable instead of hardcoded "return"
-                    plantuml_lines.append(f"{func_name}-->User: {action}")
-                    
-        elif action == 'command':
-            plantuml_lines.append(f"note over User: {parsed.get('message', '')}")
-            
-        elif action == 'info':
-            if parsed.get('message'):
-                plantuml_lines.append(f"note right of {func_name}: {parsed['message'][:50]}...")
-    
-    plantuml_lines.append("@enduml")
-    return "\n".join(plantuml_lines)
-
-def parse_qdma_log_to_activity_puml(log_lines):
-    """Generate PlantUML activity diagram for QDMA logs"""
-    plantuml_lines = ["@startuml"]
-    plantuml_lines.append("title QDMA Driver Activity Flow")
-    plantuml_lines.append("start")
-    
-    for line in log_lines:
-        parsed = parse_qdma_log_line(line)
-        if not parsed:
-            continue
-            
-        func_name = parsed['function']
-        action = parsed['action']
-        
-        if action == 'entering':
-            plantuml_lines.append(f":Enter {func_name};")
-        elif action == 'exiting':
-            plantuml_lines.append(f":Exit {func_name};")
-        elif action == 'command':
-            plantuml_lines.append(f":Execute Command\\n{parsed.get('message', '')[:30]}...;")
-        elif action == 'info' and parsed.get('message'):
-            plantuml_lines.append(f"note right: {parsed['message'][:40]}...")
-    
-    plantuml_lines.append("stop")
-    plantuml_lines.append("@enduml")
-    return "\n".join(plantuml_lines)
-
-def parse_qdma_log_to_component_puml(log_lines):
-    """Generate PlantUML component diagram for QDMA logs"""
-    plantuml_lines = ["@startuml"]
-    plantuml_lines.append("title QDMA Driver Component Interaction")
-    
-    modules = set()
-    functions = set()
-    interactions = set()
-    
-    for line in log_lines:
-        parsed = parse_qdma_log_line(line)
-        if not parsed:
-            continue
-            
-        module = parsed['module']
-        func_name = parsed['function']
-        
-        modules.add(module)
-        functions.add(func_name)
-        
-        if parsed['action'] == 'entering':
-            interactions.add((module, func_name))
-    
-    # Add components
-    for module in sorted(modules):
-        plantuml_lines.append(f"package {module} {{")
-        module_functions = [parse_qdma_log_line(line) for line in log_lines 
-                          if parse_qdma_log_line(line) and parse_qdma_log_line(line)['module'] == module]
-        unique_funcs = set(parsed['function'] for parsed in module_functions if parsed)
-        for func in sorted(unique_funcs):
-            plantuml_lines.append(f"  component {func}")
-        plantuml_lines.append("}")
-    
-    # Add interactions
-    prev_func = None
-    for line in log_lines:
-        parsed = parse_qdma_log_line(line)
-        if parsed and parsed['action'] == 'entering':
-            if prev_func:
-                plantuml_lines.append(f"{prev_func} --> {parsed['function']}")
-            prev_func = parsed['function']
-    
-    plantuml_lines.append("@enduml")
-    return "\n".join(plantuml_lines)
+# A live diagram shows only its newest pages, so a refresh costs the same however long the capture runs
+LIVE_PAGES_SHOWN = 2
 
-# --------------------------
-# Legacy parsers for backward compatibility
-# --------------------------
+# Set to a directory to keep rendered diagrams on disk as well as in memory (shared by all sessions)
+DIAGRAM_CACHE_DIR = os.environ.get("LOG_VISUALIZER_CACHE_DIR")
 
-def parse_log_to_puml(log_lines):
-    plantuml_lines = ["@startuml", "participant Caller"]
-    participants = set(["Caller"])
-
-    for line in log_lines:
-        line = line.strip()
-        match = re.search(r"\bFunction (\w+)\b.*?\b(entering|command|info|exiting|called|completed|error|retry|skipped)\b", line, re.IGNORECASE)
-        if match:
-            fn = match.group(1)
-            action = match.group(2).lower()
-
-            if fn not in participants:
-                plantuml_lines.append(f"participant {fn}")
-                participants.add(fn)
-
-            if action in ["entering", "called", "command", "retry"]:
-                plantuml_lines.append(f"Caller -> {fn}: {action}")
-            elif action in ["exiting", "completed"]:
-                plantuml_lines.append(f"{fn} --> Caller: {action}")
-            elif action in ["info", "error"]:
-                plantuml_lines.append(f"note right of {fn}: {action.upper()}")
-            elif action == "skipped":
-                plantuml_lines.append(f"note right of Caller: Skipped {fn}")
-        else:
-            plantuml_lines.append(f"note right of Caller: {line}")
-
-    plantuml_lines.append("@enduml")
-    return "\n".join(plantuml_lines)
-
-
-def parse_log_to_activity_puml(log_lines):
-    """Legacy activity parser"""
-    plantuml_lines = ["@startuml", "start"]
-    for line in log_lines:
-        line = line.strip()
-        if "is called" in line:
-            fn = re.search(r"Function (\w+) is called", line)
-            if fn:
-                plantuml_lines.append(f":Call {fn.group(1)};")
-        elif "is completed" in line:
-            fn = re.search(r"Function (\w+) is completed", line)
-            if fn:
-                plantuml_lines.append(f":Complete {fn.group(1)};")
-        elif "caused error" in line:
-            fn = re.search(r"Function (\w+) caused error", line)
-            if fn:
-                plantuml_lines.append(f"note right: {fn.group(1)} error")
-        elif "is skipped" in line:
-            fn = re.search(r"Function (\w+) is skipped", line)
-            if fn:
-                plantuml_lines.append(f"note right: {fn.group(1)} skipped")
-        elif "Retrying Function" in line:
-            fn = re.search(r"Retrying Function (\w+)", line)
-            if fn:
-                plantuml_lines.append(f":Retry {fn.group(1)};")
-        else:
-            plantuml_lines.append(f"note right: {line[:30]}...")
-    plantuml_lines.append("stop")
-    plantuml_lines.append("@enduml")
-    return "\n".join(plantuml_lines)
-
-def parse_log_to_component_puml(log_lines):
-    """Legacy component parser"""
-    plantuml_lines = ["@startuml"]
-    components = set()
-    for line in log_lines:
-        fn = re.search(r"Function (\w+)", line)
-        if fn:
-            components.add(fn.group(1))
-    for comp in components:
-        plantuml_lines.append(f"component {comp}")
-    for line in log_lines:
-        call = re.search(r"Function (\w+) is called", line)
-        complete = re.search(r"Function (\w+) is completed", line)
-        if call and complete:
-            plantuml_lines.append(f"{call.group(1)} --> {complete.group(1)}")
-    plantuml_lines.append("@enduml")
-    return "\n".join(plantuml_lines)
+SAMPLING_LABELS = {
+    "Stride (every k-th call subtree)": SAMPLE_STRIDE,
+    "Reservoir (random whole call subtrees)": SAMPLE_RESERVOIR,
+    "First/last occurrences per function": SAMPLE_FIRST_LAST,
+}
 
-# --------------------------
-# Auto-detect log format
-# --------------------------
+FLAME_WEIGHTS = {"Duration (µs)": WEIGHT_DURATION, "Call count": WEIGHT_COUNT}
+
+
+def show_live_pages(pages, total, renderer, caption):
+    """Render the newest `pages` of a `total`-page live diagram with the selected renderer and display them"""
+    for number, page in enumerate(pages, total - len(pages) + 1):
+        if renderer == RENDERER_SVG:
+            # Drawn in-process: no Java, no network round trip, no server size limit
+            image = render_svg(page)
+        else:
+            image = get_plantuml_image_url(diagram_to_puml(page))
+        page_caption = caption if total == 1 else f"{caption} (page {number}/{total})"
+        st.image(image, caption=page_caption, use_container_width=True)
+
+
+def render_pages(diagram, renderer, page_steps=DEFAULT_PAGE_STEPS):
+    """PlantUML text and image per page; False as second item when an image could only be linked, not fetched"""
+    if renderer == RENDERER_SVG:
+        return [(diagram_to_puml(diagram), render_svg(diagram))], True
+    server = plantuml_server_state()
+    pages = []
+    complete = True
+    for page in paginate_diagram(diagram, page_steps):
+        puml_content = diagram_to_puml(page)
+        if not puml_content:
+            continue
+        image = None
+        if time.monotonic() >= server['retry_at']:
+            try:
+                image = fetch_plantuml_image(puml_content, timeout=PLANTUML_FETCH_TIMEOUT)
+            except urllib.error.HTTPError as exc:
+                # The server is up and rejected this page (e.g. a syntax error): PlantUML replies
+                # with an image of the error, as cacheable as any other page. Anything else (a
+                # proxy's error page) is left to the browser, without marking the server down.
+                body = exc.read()
+                image = body if body.startswith(PNG_SIGNATURE) else None
+            except OSError:
+                # Remembered for every session, so later pages and views do not wait again
+                server['retry_at'] = time.monotonic() + PLANTUML_RETRY_AFTER
+        if image is None:
+            # The browser may still reach the server the app host cannot; leave the fetch to it
+            image = get_plantuml_image_url(puml_content)
+            complete = False
+        pages.append((puml_content, image))
+    return pages, complete
+
+
+@st.cache_resource
+def plantuml_server_state():
+    """Shared record of when the PlantUML server may be tried again after a failed fetch"""
+    return {'retry_at': 0.0}
+
+
+def show_pages(pages, caption):
+    for number, (_, image) in enumerate(pages, 1):
+        page_caption = caption if len(pages) == 1 else f"{caption} (page {number}/{len(pages)})"
+        st.image(image, caption=page_caption, use_container_width=True)
+
+
+@st.cache_resource
+def diagram_cache():
+    return DiagramCache(directory=DIAGRAM_CACHE_DIR)
+
+
+def show_cached_diagram(key, build, renderer, caption, page_steps=DEFAULT_PAGE_STEPS):
+    """Show a diagram from the rendered-diagram cache; `build` makes the model only on a miss"""
+    cache = diagram_cache()
+    pages = cache.get(key)
+    if pages is None:
+        pages, complete = render_pages(build(), renderer, page_steps)
+        if complete:
+            cache.put(key, pages)
+    show_pages(pages, caption)
+
+
+def upload_lines(upload, custom_formats):
+    """Line iterator and detected format for one uploaded log"""
+    if detect_compression(upload) is not None:
+        # .gz/.xz/.zst: decompressed chunk by chunk straight into the line splitter
+        return detect_from_head(iter_log_lines(open_decompressed(upload)),
+                                lambda head: detect_format(head, custom_formats))
+    log_format = detect_format(sample_stream_lines(upload), custom_formats)
+    # Decode and split the upload chunk by chunk, straight into the parser
+    return iter_log_lines(upload), log_format
+
+
+def flame_chart(rows):
+    """Interactive flame graph: drag to pan, scroll to zoom, hover for stack and weight"""
+    frame = pd.DataFrame(rows)
+    return alt.Chart(frame).mark_rect(stroke="white", strokeWidth=0.5).encode(
+        x=alt.X("x0:Q", axis=None),
+        x2="x1:Q",
+        y=alt.Y("depth:O", sort="descending", axis=None),
+        color=alt.Color("name:N", legend=None, scale=alt.Scale(scheme="orangered")),
+        tooltip=["stack:N", "weight:Q", alt.Tooltip("share:Q", format=".1%")],
+    ).properties(height=max(120, 22 * (int(frame["depth"].max()) + 1))).interactive(bind_y=False)
 
-def detect_log_format(log_lines):
-    """Detect if logs are QDMA format or legacy format"""
-    qdma_indicators = 0
-    legacy_indicators = 0
-    
-    for line in log_lines[:10]:  # Check first 10 lines
-        if 'qdma_pf:' in line and 'QDMA entering' in line or 'QDMA exiting' in line:
-            qdma_indicators += 1
-        elif 'Function' in line and ('is called' in line or 'is completed' in line):
-            legacy_indicators += 1
-    
-    return "qdma" if qdma_indicators > legacy_indicators else "legacy"
 
 # --------------------------
 # Streamlit UI
@@ -370,101 +190,265 @@ st.title("📊 Enhanced Log File to Diagram Visualizer")
 st.write("Upload or paste your log file below to generate a visual diagram. Supports QDMA driver logs.")
 
 # Input options
-uploaded_file = st.file_uploader("Upload log file", type=["txt", "log"])
+uploaded_files = st.file_uploader(
+    "Upload log file(s)", type=["txt", "log", *COMPRESSED_EXTENSIONS, *STORE_EXTENSIONS], accept_multiple_files=True,
+    help="Several files are merged into one timeline by timestamp, each event tagged with its file name. "
+         "Parquet/Arrow files saved from this app reload without parsing."
+)
+local_path = st.text_input(
+    "Or read a log file from local disk",
+    help="Path on the machine running this app. The file is memory-mapped and parsed as bytes, so multi-GB logs never get loaded into memory."
+)
+if local_path:
+    with st.expander("⚙️ Parallel parsing options", expanded=False):
+        parse_workers = st.number_input(
+            "Worker processes", min_value=1, max_value=256, value=os.cpu_count() or 1,
+            help="QDMA logs read from disk are split at line boundaries and parsed across this many processes"
+        )
+        parse_chunk_mb = st.number_input(
+            "Chunk size (MB)", min_value=1, max_value=4096, value=64,
+            help="Bytes of log handed to a worker per task"
+        )
+    live_tail = st.checkbox(
+        "📡 Live tail: follow this file as it grows",
+        help="Only newly appended lines are parsed on each refresh, e.g. for `dmesg -w > qdma.log`"
+    )
+    if live_tail:
+        tail_interval = st.number_input("Refresh every (s)", min_value=1, max_value=600, value=2)
+else:
+    live_tail = False
 log_text = st.text_area("Or paste log content here", height=200)
 
+# User-defined formats live in this session only; they join the built-in registry for detection and parsing
+if 'custom_format_specs' not in st.session_state:
+    st.session_state['custom_format_specs'] = {}
+with st.expander("🧩 Custom log formats", expanded=False):
+    format_name = st.text_input("Format name")
+    format_pattern = st.text_input(
+        "Regex with named groups",
+        help="Groups: timestamp, module, function, action, thread, message (all optional)"
+    )
+    format_markers = st.text_input(
+        "Literal markers (comma separated)",
+        help="Lines without any of these substrings are never handed to the regex"
+    )
+    if st.button("➕ Add format") and format_name and format_pattern:
+        markers = [marker.strip() for marker in format_markers.split(",") if marker.strip()]
+        try:
+            regex_format(format_name, format_pattern, markers)
+        except (re.error, ValueError) as exc:
+            st.error(f"Invalid pattern: {exc}")
+        else:
+            st.session_state['custom_format_specs'][format_name] = (format_pattern, markers)
+    for name, (pattern, markers) in st.session_state['custom_format_specs'].items():
+        st.caption(f"{name}: `{pattern}` markers={markers}")
+custom_formats = [regex_format(name, pattern, markers)
+                  for name, (pattern, markers) in st.session_state['custom_format_specs'].items()]
+
 diagram_type = st.radio(
     "Select diagram type:",
     ("Sequence Diagram", "Activity Diagram", "Component Diagram")
 )
 
+renderer = st.radio(
+    "Render with:",
+    (RENDERER_PLANTUML, RENDERER_SVG),
+    horizontal=True,
+    help="Offline SVG draws the diagram locally and works on air-gapped machines"
+)
+if renderer == RENDERER_PLANTUML:
+    page_steps = st.number_input(
+        "Max messages per page", min_value=10, max_value=10000, value=DEFAULT_PAGE_STEPS, step=50,
+        help="Large diagrams are split into numbered pages so each image stays within server URL limits"
+    )
+else:
+    page_steps = DEFAULT_PAGE_STEPS
+compress_loops = st.checkbox(
+    "Collapse repeated call patterns into loops", value=True,
+    help="Back-to-back repetitions of the same calls or notes in a sequence diagram are drawn once as 'loop N times'"
+)
+
+max_events = st.number_input(
+    "Max events per diagram (0 = no limit)", min_value=0, max_value=10_000_000, value=0, step=1000,
+    help="Larger logs are sampled down to this many events, keeping whole calls so stacks stay balanced; "
+         "the diagram notes what was dropped"
+)
+if max_events:
+    sampling_mode = SAMPLING_LABELS[st.selectbox("Sampling:", list(SAMPLING_LABELS))]
+else:
+    sampling_mode = SAMPLE_STRIDE
+
 submit = st.button("🔍 Generate Diagram")
 
-if (uploaded_file or log_text) and submit:
-    if uploaded_file:
-        log_lines = uploaded_file.read().decode("utf-8").splitlines()
-    else:
-        log_lines = log_text.splitlines()
+if live_tail:
+    if not os.path.isfile(local_path):
+        st.error(f"Log file not found: {local_path}")
+        st.stop()
+    # One live diagram per (file, diagram type); its builder state survives reruns
+    live = st.session_state.get('live_diagram')
+    if live is None or (live.path, live.diagram_type) != (local_path, diagram_type):
+        live = st.session_state['live_diagram'] = LiveDiagram(local_path, diagram_type)
+
+    @st.fragment(run_every=int(tail_interval))
+    def show_live_diagram():
+        new_events = live.refresh()
+        if live.log_format is None:
+            st.info("Waiting for log lines...")
+            return
+        if live.log_format != "qdma":
+            st.warning("Live tail follows QDMA driver logs only.")
+            return
+        pages, total = live.pages(int(page_steps), compress_loops, LIVE_PAGES_SHOWN)
+        st.caption(f"{live.event_count} events parsed, {new_events} new since the last refresh"
+                   + (f"; showing the newest {len(pages)} of {total} pages" if total > len(pages) else ""))
+        show_live_pages(pages, total, renderer, f"Live {diagram_type}")
+
+    show_live_diagram()
+elif (uploaded_files or local_path or log_text) and submit:
+    # Auto-detect the log format from lines sampled across the whole input, not just its head
+    merge_sources = None
+    loaded_table = None
+    try:
+        if len(uploaded_files) > 1:
+            if any(store_kind(upload) for upload in uploaded_files):
+                st.error("Saved event tables (Parquet/Arrow) can only be opened one at a time.")
+                st.stop()
+            # Several logs (e.g. one per PF/VF or host): each keeps its own format, then all are merged by timestamp
+            content_key = tuple(stream_digest(upload) for upload in uploaded_files)
+            merge_sources = [(upload.name, *upload_lines(upload, custom_formats)) for upload in uploaded_files]
+            log_format = merged_format([source_format for _, _, source_format in merge_sources])
+            log_lines = None
+        elif uploaded_files and store_kind(uploaded_files[0]):
+            # Pre-parsed event table: no detection and no parsing
+            content_key = stream_digest(uploaded_files[0])
+            loaded_table, log_format = load_event_table(uploaded_files[0])
+            log_lines = None
+        elif uploaded_files:
+            content_key = stream_digest(uploaded_files[0])
+            log_lines, log_format = upload_lines(uploaded_files[0], custom_formats)
+        elif local_path:
+            if not os.path.isfile(local_path):
+                st.error(f"Log file not found: {local_path}")
+                st.stop()
+            content_key = file_fingerprint(local_path)
+            with open(local_path, "rb") as handle:
+                compressed = detect_compression(handle) is not None
+                stored = store_kind(handle) is not None
+            if stored:
+                # Parquet is memory-mapped and Arrow IPC read zero-copy; nothing is parsed
+                loaded_table, log_format = load_event_table(local_path)
+                log_lines = None
+            elif compressed:
+                log_lines, log_format = detect_from_head(iter_log_file_lines(local_path),
+                                                         lambda head: detect_format(head, custom_formats))
+            else:
+                log_format = detect_format(sample_file_lines(local_path), custom_formats)
+                log_lines = None  # parsed straight from the memory-mapped file below
+        else:
+            content_key = text_digest(log_text)
+            all_lines = log_text.splitlines()
+            log_format = detect_format(all_lines[::max(1, len(all_lines) // 200)], custom_formats)
+            log_lines = iter(all_lines)
+    except ValueError as exc:  # e.g. .zst without the zstandard package
+        st.error(str(exc))
+        st.stop()
 
-    st.session_state['log_lines'] = log_lines
     st.session_state['diagram_type'] = diagram_type
-    
-    # Auto-detect log format
-    log_format = detect_log_format(log_lines)
     st.session_state['log_format'] = log_format
+    st.session_state['log_key'] = content_key
+
+    # Logs are parsed once per content + format + custom formats; every diagram and filter below reads the event list / table
+    if 'parse_cache' not in st.session_state:
+        st.session_state['parse_cache'] = LRUCache(PARSE_CACHE_ENTRIES, PARSE_CACHE_MAX_EVENTS)
+    parse_cache = st.session_state['parse_cache']
+    # Session formats change how mixed logs are dispatched, so they are part of the key
+    format_specs = tuple(sorted((name, pattern, tuple(markers))
+                                for name, (pattern, markers) in st.session_state['custom_format_specs'].items()))
+    cache_key = (content_key, log_format, format_specs)
+    cached = parse_cache.get(cache_key)
+    if cached is not None:
+        log_events, event_table, event_index, time_index, call_trees, latency_tables = cached
+    else:
+        if loaded_table is not None:
+            log_events = frame_to_events(loaded_table)
+        elif merge_sources is not None:
+            log_events = merge_logs(merge_sources, custom_formats)
+        elif log_lines is None and log_format == "qdma":
+            log_events = parse_qdma_file_parallel(local_path, int(parse_workers), int(parse_chunk_mb) << 20)
+        elif log_lines is None:
+            log_events = parse_events(iter_log_file_lines(local_path), log_format, custom_formats)
+        else:
+            # Mixed logs are dispatched line by line to the format that claims each line
+            log_events = parse_events(log_lines, log_format, custom_formats)
+        event_table = loaded_table if loaded_table is not None else events_to_frame(log_events)
+        event_index = EventIndex.from_frame(event_table)
+        time_index = TimeIndex.from_frame(event_table)
+        # Calling-context trees are rebuilt per thread so interleaved threads do not corrupt each other
+        call_trees = build_call_trees(log_events) if log_format != "legacy" else {}
+        # Per-function latency from the [seconds.micros] timestamps of matched entering/exiting pairs
+        latency_tables = latency_profile(log_events) if log_format != "legacy" else None
+        parse_cache.put(cache_key, (log_events, event_table, event_index, time_index, call_trees, latency_tables),
+                        cost=len(log_events))
+    st.session_state['log_events'] = log_events
+    st.session_state['event_table'] = event_table
+    st.session_state['event_index'] = event_index
+    st.session_state['time_index'] = time_index
+    st.session_state['call_trees'] = call_trees
+    st.session_state['latency_tables'] = latency_tables
     
-    st.info(f"Detected log format: {log_format.upper()}")
-
-    # Generate PlantUML code based on format
-    if log_format == "qdma":
-        if diagram_type == "Sequence Diagram":
-            puml_content = parse_qdma_log_to_puml(log_lines)
-        elif diagram_type == "Activity Diagram":
-            puml_content = parse_qdma_log_to_activity_puml(log_lines)
-        elif diagram_type == "Component Diagram":
-            puml_content = parse_qdma_log_to_component_puml(log_lines)
-    else:  # legacy format
-        if diagram_type == "Sequence Diagram":
-            puml_content = parse_log_to_puml(log_lines)
-        elif diagram_type == "Activity Diagram":
-            puml_content = parse_log_to_activity_puml(log_lines)
-        elif diagram_type == "Component Diagram":
-            puml_content = parse_log_to_component_puml(log_lines)
-
-    # Display diagram
-    if puml_content:
-        image_url = get_plantuml_image_url(puml_content)
-        st.image(image_url, caption=f"Generated {diagram_type}", use_container_width=True)
-        # col1, col2 = st.columns([2, 1])
-        
-        # with col1:
-        #     st.image(image_url, caption=f"Generated {diagram_type}", use_container_width=True)
+    if merge_sources is not None:
+        st.info(f"Merged {len(merge_sources)} logs by timestamp ({log_format.upper()})")
+    if log_format == MIXED_FORMAT:
+        st.info("Detected log format: MIXED (each line parsed by the format that claims it)")
+    else:
+        st.info(f"Detected log format: {log_format.upper()}")
+
+    # Build the diagram model based on format, then display it; repeated views come from the diagram cache
+    render_settings = {'log_format': log_format, 'renderer': renderer, 'page_steps': int(page_steps),
+                       'compress_loops': compress_loops, 'custom_formats': st.session_state['custom_format_specs'],
+                       'max_events': int(max_events), 'sampling': sampling_mode}
+    show_cached_diagram(
+        diagram_key(content_key, diagram_type, render_settings),
+        lambda: build_bounded_diagram(log_format, diagram_type, log_events, compress_loops, int(max_events),
+                                      sampling_mode),
+        renderer, f"Generated {diagram_type}", int(page_steps)
+    )
+    # col1, col2 = st.columns([2, 1])
+    
+    # with col1:
+    #     st.image(image_url, caption=f"Generated {diagram_type}", use_container_width=True)
+    
+    # with col2:
+    #     st.subheader("PlantUML Code")
+    #     st.code(puml_content, language="text")
         
-        # with col2:
-        #     st.subheader("PlantUML Code")
-        #     st.code(puml_content, language="text")
-            
-            # Download button for PlantUML code
-            # st.download_button(
-            #     label="📥 Download PlantUML Code",
-            #     data=puml_content,
-            #     file_name=f"{diagram_type.lower().replace(' ', '_')}.puml",
-            #     mime="text/plain"
-            # )
+        # Download button for PlantUML code
+        # st.download_button(
+        #     label="📥 Download PlantUML Code",
+        #     data=puml_content,
+        #     file_name=f"{diagram_type.lower().replace(' ', '_')}.puml",
+        #     mime="text/plain"
+        # )
 else:
     st.info("📂 Please upload a log file or paste log content, select diagram type, and click Generate Diagram.")
 
 # --- Enhanced Filtering options (shown only after diagram is generated) ---
-if 'log_lines' in st.session_state and 'diagram_type' in st.session_state:
-    log_lines = st.session_state['log_lines']
+if 'event_table' in st.session_state and 'diagram_type' in st.session_state:
+    log_events = st.session_state['log_events']
+    event_table = st.session_state['event_table']
+    event_index = st.session_state['event_index']
+    time_index = st.session_state['time_index']
     diagram_type = st.session_state['diagram_type']
     log_format = st.session_state.get('log_format', 'legacy')
+    log_key = st.session_state.get('log_key')
 
-    # Extract functions and actions from the actual log
-    function_set = set()
-    module_set = set()
-    action_set = set()
-    thread_set = set()
-
-    for line in log_lines:
-        if log_format == "qdma":
-            parsed = parse_qdma_log_line(line)
-            if parsed:
-                function_set.add(parsed['function'])
-                module_set.add(parsed['module'])
-                action_set.add(parsed['action'])  # This will now collect actual actions from the log
-                if parsed['thread_id']:
-                    thread_set.add(parsed['thread_id'])
-        else:
-            # Legacy format parsing
-            fn_match = re.search(r"Function (\w+)", line)
-            if fn_match:
-                function_set.add(fn_match.group(1))
-            
-            # Extract actual action from the log line
-            action_match = re.search(r"\b(entering|exiting|command|info|called|completed|error|retry|skipped)\b", line, re.IGNORECASE)
-            if action_match:
-                action_set.add(action_match.group(1).lower())
+    # Extract functions and actions from the event table categories
+    options = frame_filter_options(event_table)
+    function_set = options['functions']
+    module_set = options['modules']
+    action_set = options['actions']  # This will now collect actual actions from the log
+    thread_set = options['threads']
+    source_set = options['sources']
 
     with st.expander("🔍 Advanced Filter Options", expanded=False):
         col1, col2, col3 = st.columns(3)
@@ -478,7 +462,7 @@ if 'log_lines' in st.session_state and 'diagram_type' in st.session_state:
             )
 
         with col2:
-            if log_format == "qdma":
+            if log_format != "legacy":
                 selected_modules = st.multiselect(
                     "Filter by Modules", 
                     sorted(module_set), 
@@ -496,7 +480,7 @@ if 'log_lines' in st.session_state and 'diagram_type' in st.session_state:
                 help="Select action types to include"
             )
 
-        if log_format == "qdma" and thread_set:
+        if log_format != "legacy" and thread_set:
             selected_threads = st.multiselect(
                 "Filter by Thread ID", 
                 sorted(thread_set), 
@@ -506,69 +490,64 @@ if 'log_lines' in st.session_state and 'diagram_type' in st.session_state:
         else:
             selected_threads = []
 
+        if len(source_set) > 1:
+            selected_sources = st.multiselect(
+                "Filter by Source Log",
+                sorted(source_set),
+                default=list(source_set),
+                help="Merged logs: keep events from these files only"
+            )
+        else:
+            selected_sources = []
+
+        # Time window over the log's own timestamps (legacy logs carry none)
+        time_start, time_end = time_index.bounds()
+        if time_end > time_start:
+            time_window = st.slider(
+                "Time window (s)",
+                min_value=time_start,
+                max_value=time_end,
+                value=(time_start, time_end),
+                step=1e-6,
+                format="%.6f",
+                help="Only events inside this window are drawn"
+            )
+        else:
+            time_window = None
+
         filter_submit = st.button("🎯 Generate Filtered Diagram")
 
     if filter_submit:
-        # Filter log lines based on selections
-        filtered_lines = []
-        for line in log_lines:
-            if log_format == "qdma":
-                parsed = parse_qdma_log_line(line)
-                if parsed:
-                    include_line = True
-                    
-                    if selected_functions and parsed['function'] not in selected_functions:
-                        include_line = False
-                    if selected_modules and parsed['module'] not in selected_modules:
-                        include_line = False
-                    if selected_actions and parsed['action'] not in selected_actions:
-                        include_line = False
-                    if selected_threads and parsed['thread_id'] and parsed['thread_id'] not in selected_threads:
-                        include_line = False
-                    
-                    if include_line:
-                        filtered_lines.append(line)
-            else:
-                # Legacy format filtering
-                fn_match = re.search(r"Function (\w+)", line)
-                fn_name = fn_match.group(1) if fn_match else None
-
-                line_action = None
-                if "is called" in line:
-                    line_action = "is called"
-                elif "is completed" in line:
-                    line_action = "is completed"
-                elif "caused error" in line:
-                    line_action = "caused error"
-                elif "is skipped" in line:
-                    line_action = "is skipped"
-                elif "Retrying Function" in line:
-                    line_action = "Retrying"
-
-                if (not selected_functions or (fn_name and fn_name in selected_functions)) and \
-                   (not selected_actions or (line_action and line_action in selected_actions)):
-                    filtered_lines.append(line)
-
-        # Regenerate diagram with filtered lines
-        if log_format == "qdma":
-            if diagram_type == "Sequence Diagram":
-                filtered_puml = parse_qdma_log_to_puml(filtered_lines)
-            elif diagram_type == "Activity Diagram":
-                filtered_puml = parse_qdma_log_to_activity_puml(filtered_lines)
-            elif diagram_type == "Component Diagram":
-                filtered_puml = parse_qdma_log_to_component_puml(filtered_lines)
-        else:
-            if diagram_type == "Sequence Diagram":
-                filtered_puml = parse_log_to_puml(filtered_lines)
-            elif diagram_type == "Activity Diagram":
-                filtered_puml = parse_log_to_activity_puml(filtered_lines)
-            elif diagram_type == "Component Diagram":
-                filtered_puml = parse_log_to_component_puml(filtered_lines)
-
-        if filtered_puml:
-            image_url = get_plantuml_image_url(filtered_puml)
-            st.subheader("🎯 Filtered Diagram")
-            st.image(image_url, caption=f"Filtered {diagram_type}", use_container_width=True)
+        def build_filtered_diagram():
+            # Filter events through the posting lists: union within a column, intersection across columns
+            selected_rows = event_index.select(selected_functions, selected_modules, selected_actions,
+                                               selected_threads, selected_sources)
+            if time_window is not None:
+                # Binary search on the sorted timestamps; the builders only see the slice
+                selected_rows = time_index.restrict(selected_rows, *time_window)
+            filtered_events = [log_events[i] for i in selected_rows]
+            # Regenerate diagram with filtered events
+            return build_bounded_diagram(log_format, diagram_type, filtered_events, compress_loops,
+                                         int(max_events), sampling_mode)
+
+        # Same log, type, settings and selections (in any order) -> same key, so the render is reused
+        filter_set = normalize_filters(
+            {'functions': selected_functions, 'modules': selected_modules, 'actions': selected_actions,
+             'threads': selected_threads, 'sources': selected_sources},
+            {'functions': function_set, 'modules': module_set, 'actions': action_set,
+             'threads': thread_set, 'sources': source_set}
+        )
+        filter_set['time_window'] = (None if time_window is None or tuple(time_window) == (time_start, time_end)
+                                     else [round(bound, 6) for bound in time_window])
+        render_settings = {'log_format': log_format, 'renderer': renderer, 'page_steps': int(page_steps),
+                           'compress_loops': compress_loops,
+                           'custom_formats': st.session_state['custom_format_specs'],
+                           'max_events': int(max_events), 'sampling': sampling_mode}
+        st.subheader("🎯 Filtered Diagram")
+        show_cached_diagram(
+            diagram_key(log_key, diagram_type, render_settings, filter_set),
+            build_filtered_diagram, renderer, f"Filtered {diagram_type}", int(page_steps)
+        )
             
             # col1, col2 = st.columns([2, 1])
             # with col1:
@@ -581,3 +560,54 @@ if 'log_lines' in st.session_state and 'diagram_type' in st.session_state:
             #         file_name=f"filtered_{diagram_type.lower().replace(' ', '_')}.puml",
             #         mime="text/plain"
             #     )
+
+    call_trees = st.session_state.get('call_trees')
+    if call_trees:
+        with st.expander("🌳 Per-thread call tree", expanded=False):
+            st.dataframe(call_tree_rows(call_trees), use_container_width=True, hide_index=True)
+            st.download_button(
+                label="📥 Download Call Trees (JSON)",
+                # Serialized only when the button is clicked, not on every rerun
+                data=lambda: call_trees_json(call_trees),
+                file_name="call_trees.json",
+                mime="application/json"
+            )
+
+    latency_tables = st.session_state.get('latency_tables')
+    if latency_tables is not None and len(latency_tables[0]):
+        with st.expander("⏱️ Function latency profile", expanded=False):
+            latency_mode = st.radio(
+                "Time measure:",
+                ["Inclusive (with callees)", "Exclusive (self time)"],
+                horizontal=True
+            )
+            latency_table = latency_tables[0] if latency_mode.startswith("Inclusive") else latency_tables[1]
+            # Click a column header to sort by it
+            st.dataframe(latency_table, use_container_width=True, hide_index=True)
+
+    if call_trees:
+        with st.expander("🔥 Flame graph", expanded=False):
+            flame_weight = FLAME_WEIGHTS[st.radio("Weight by:", list(FLAME_WEIGHTS), horizontal=True)]
+            flame_rows = flame_layout(call_trees, flame_weight)
+            if flame_rows:
+                st.altair_chart(flame_chart(flame_rows), use_container_width=True)
+            st.download_button(
+                label="📥 Download Folded Stacks",
+                data=folded_text(folded_stacks(call_trees, flame_weight)),
+                file_name=f"stacks_{flame_weight}.folded",
+                mime="text/plain"
+            )
+
+    with st.expander("💾 Save parsed events", expanded=False):
+        store_label = st.radio("File format:", ["Parquet", "Arrow IPC"], horizontal=True,
+                               help="Open the saved file here later (upload or local path) to skip parsing")
+        store_format = STORE_PARQUET if store_label == "Parquet" else STORE_ARROW
+        if st.button("📦 Prepare event file"):
+            store_buffer = io.BytesIO()
+            save_event_table(event_table, store_buffer, log_format, store_format)
+            st.download_button(
+                label=f"📥 Download Events ({store_label})",
+                data=store_buffer.getvalue(),
+                file_name=f"events.{store_format}",
+                mime="application/octet-stream"
+            )
@@ -0,0 +1,196 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from modules.diagram_sampling import SAMPLE_STRIDE, SAMPLING_MODES, build_bounded_diagram
+from modules.log_diagrams import diagram_to_puml
+from modules.log_events import LogEvent
+from modules.log_formats import MIXED_FORMAT, detect_format, parse_events, registered_formats
+from modules.log_io import (
+    COMPRESSED_EXTENSIONS,
+    detect_compression,
+    detect_from_head,
+    iter_log_file_lines,
+    sample_file_lines,
+)
+from modules.log_parallel import parse_qdma_file_parallel
+from modules.log_store import STORE_EXTENSIONS, frame_to_events, load_event_table, store_kind
+from modules.svg_render import render_svg
+
+
+# Command-line name -> diagram type label used by build_diagram
+DIAGRAM_TYPES = {
+    'sequence': "Sequence Diagram",
+    'activity': "Activity Diagram",
+    'component': "Component Diagram",
+}
+
+OUTPUT_PUML = 'puml'
+OUTPUT_SVG = 'svg'
+
+# Files picked up when an input is a directory
+LOG_EXTENSIONS = ('txt', 'log', *COMPRESSED_EXTENSIONS, *STORE_EXTENSIONS)
+
+SUMMARY_FILE = 'summary.json'
+
+
+def expand_inputs(inputs: Sequence[str], recursive: bool = False) -> List[str]:
+    """Resolve files, directories and glob patterns to a sorted list of log files"""
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*') if recursive else os.path.join(item, '*')
+            paths.update(path for path in glob.glob(pattern, recursive=recursive)
+                         if os.path.isfile(path) and path.rsplit('.', 1)[-1].lower() in LOG_EXTENSIONS)
+        elif os.path.isfile(item):
+            paths.add(item)
+        else:
+            matches = [path for path in glob.glob(item, recursive=True) if os.path.isfile(path)]
+            if not matches:
+                print(f"No files match {item}", file=sys.stderr)
+            paths.update(matches)
+    return sorted(paths)
+
+
+def load_log(path: str, log_format: Optional[str] = None) -> Tuple[List[LogEvent], str]:
+    """Parse one log file (plain, compressed or a saved event table) as the app does for a local path"""
+    with open(path, 'rb') as handle:
+        stored = store_kind(handle) is not None
+        compressed = detect_compression(handle) is not None
+    if stored:
+        frame, stored_format = load_event_table(path)
+        return frame_to_events(frame), stored_format
+    if compressed:
+        if log_format is None:
+            log_lines, log_format = detect_from_head(iter_log_file_lines(path), detect_format)
+        else:
+            log_lines = iter_log_file_lines(path)
+        return parse_events(log_lines, log_format), log_format
+    if log_format is None:
+        log_format = detect_format(sample_file_lines(path))
+    if log_format == "qdma":
+        # Files are already spread across the batch pool, so each one is parsed in-process
+        return parse_qdma_file_parallel(path, workers=1), log_format
+    return parse_events(iter_log_file_lines(path), log_format), log_format
+
+
+def output_stem(path: str, base: str, out_dir: str) -> str:
+    """Output path prefix for a log, mirroring its location under `base` so equal file names do not collide"""
+    relative = os.path.relpath(os.path.abspath(path), base)
+    return os.path.join(out_dir, relative)
+
+
+def render_log(path: str, stem: str, diagram_types: Sequence[str], output: str = OUTPUT_PUML,
+               log_format: Optional[str] = None, compress_loops: bool = False,
+               max_events: Optional[int] = None, sampling: str = SAMPLE_STRIDE) -> dict:
+    """Parse one log and write one file per diagram type; returns its summary row.
+
+    Runs in a worker process, so failures are reported in the row instead of raised.
+    """
+    start = time.perf_counter()
+    row = {'path': path, 'format': None, 'events': 0, 'threads': 0, 'functions': 0,
+           'span_s': 0.0, 'outputs': [], 'seconds': 0.0, 'error': None}
+    try:
+        events, log_format = load_log(path, log_format)
+        row['format'] = log_format
+        row['events'] = len(events)
+        row['threads'] = len({event.thread_key() for event in events if event.thread_id is not None})
+        # Legacy lines that name no function carry '' as their function
+        row['functions'] = len({event.function for event in events} - {''})
+        if events:
+            row['span_s'] = round(events[-1].timestamp - events[0].timestamp, 6)
+        os.makedirs(os.path.dirname(stem) or '.', exist_ok=True)
+        for name in diagram_types:
+            diagram = build_bounded_diagram(log_format, DIAGRAM_TYPES[name], events, compress_loops,
+                                            max_events, sampling)
+            content = render_svg(diagram) if output == OUTPUT_SVG else diagram_to_puml(diagram)
+            target = f"{stem}.{name}.{output}"
+            with open(target, 'w', encoding='utf-8') as handle:
+                handle.write(content)
+            row['outputs'].append(target)
+    except Exception as exc:  # one broken log must not stop a nightly batch
+        row['error'] = f"{type(exc).__name__}: {exc}"
+    row['seconds'] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def run_batch(paths: Sequence[str], out_dir: str, diagram_types: Sequence[str], output: str = OUTPUT_PUML,
+              jobs: Optional[int] = None, log_format: Optional[str] = None,
+              compress_loops: bool = False, max_events: Optional[int] = None,
+              sampling: str = SAMPLE_STRIDE) -> List[dict]:
+    """Render every log across a process pool; summary rows come back in input order"""
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths]) if paths else '.'
+    tasks = [(path, output_stem(path, base, out_dir), diagram_types, output, log_format, compress_loops,
+              max_events, sampling) for path in paths]
+    jobs = jobs or os.cpu_count() or 1
+    rows: Dict[str, dict] = {}
+    if jobs == 1 or len(tasks) <= 1:
+        for task in tasks:
+            rows[task[0]] = _report(render_log(*task), len(rows) + 1, len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+            futures = [executor.submit(render_log, *task) for task in tasks]
+            for future in as_completed(futures):
+                row = future.result()
+                rows[row['path']] = _report(row, len(rows) + 1, len(tasks))
+    return [rows[path] for path in paths]
+
+
+def _report(row: dict, done: int, total: int) -> dict:
+    status = f"FAILED {row['error']}" if row['error'] else f"{row['format']}, {row['events']:,} events"
+    print(f"[{done}/{total}] {row['path']}: {status} ({row['seconds']:.2f} s)", file=sys.stderr)
+    return row
+
+
+def print_summary(rows: List[dict]) -> None:
+    width = max([len(row['path']) for row in rows] + [4])
+    print(f"{'log':{width}}  {'format':8} {'events':>12} {'threads':>8} {'functions':>10} {'span s':>12} {'time s':>8}")
+    for row in rows:
+        if row['error']:
+            print(f"{row['path']:{width}}  FAILED: {row['error']}")
+            continue
+        print(f"{row['path']:{width}}  {row['format']:8} {row['events']:>12,} {row['threads']:>8} "
+              f"{row['functions']:>10} {row['span_s']:>12.6f} {row['seconds']:>8.2f}")
+    failed = sum(1 for row in rows if row['error'])
+    print(f"\n{len(rows) - failed} of {len(rows)} logs rendered, {failed} failed")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate log diagrams for many logs without the web UI")
+    parser.add_argument('inputs', nargs='+', help="Log files, directories or glob patterns (quote the pattern)")
+    parser.add_argument('-o', '--out-dir', default='diagrams', help="Directory for diagrams and the summary")
+    parser.add_argument('-d', '--diagrams', nargs='+', choices=list(DIAGRAM_TYPES), default=list(DIAGRAM_TYPES))
+    parser.add_argument('-f', '--output', choices=[OUTPUT_PUML, OUTPUT_SVG], default=OUTPUT_PUML,
+                        help="PlantUML text, or SVG drawn offline")
+    parser.add_argument('-j', '--jobs', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('-r', '--recursive', action='store_true', help="Descend into subdirectories")
+    parser.add_argument('--format', dest='log_format',
+                        choices=[log_format.name for log_format in registered_formats()] + [MIXED_FORMAT],
+                        help="Skip detection and parse every log as this format")
+    parser.add_argument('--compress-loops', action='store_true', help="Fold repeated call sequences into loops")
+    parser.add_argument('--max-events', type=int, default=None,
+                        help="Sample larger logs down to this many events per diagram (whole calls are kept)")
+    parser.add_argument('--sampling', choices=list(SAMPLING_MODES), default=SAMPLE_STRIDE,
+                        help="How --max-events picks the events to keep")
+    args = parser.parse_args(argv)
+
+    paths = expand_inputs(args.inputs, args.recursive)
+    if not paths:
+        print("No log files found", file=sys.stderr)
+        return 2
+    rows = run_batch(paths, args.out_dir, args.diagrams, args.output, args.jobs, args.log_format,
+                     args.compress_loops, args.max_events, args.sampling)
+    os.makedirs(args.out_dir, exist_ok=True)
+    with open(os.path.join(args.out_dir, SUMMARY_FILE), 'w', encoding='utf-8') as handle:
+        json.dump(rows, handle, indent=2)
+    print_summary(rows)
+    return 1 if any(row['error'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Benchmarks and synthetic log generators for the log visualizer."""
@@ -0,0 +1,216 @@
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.generate_logs import generate_legacy_lines, generate_qdma_lines
+from modules.log_diagrams import (
+    encode_plantuml,
+    parse_log_to_activity_puml,
+    parse_log_to_component_puml,
+    parse_log_to_puml,
+    parse_qdma_log_to_activity_puml,
+    parse_qdma_log_to_component_puml,
+    parse_qdma_log_to_puml,
+    qdma_events_to_puml,
+)
+from modules.log_events import parse_qdma_events, parse_qdma_log_line
+from modules.log_formats import detect_format
+from modules.log_index import EventIndex
+from modules.log_io import sample_stream_lines
+from modules.log_table import events_to_frame, frame_filter_options
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+DEFAULT_SIZES = (10_000, 100_000)
+
+# A case turns the generated lines into (prepared input, timed function); the function returns
+# the number of bytes it processed so throughput can be reported in MB/s as well as lines/s
+Case = Callable[[List[str]], Tuple[object, Callable[[object], int]]]
+
+
+def _line_bytes(lines: List[str]) -> int:
+    return sum(len(line) for line in lines) + len(lines)
+
+
+def _run_lines(function: Callable[[List[str]], object]) -> Case:
+    def case(lines):
+        size = _line_bytes(lines)
+        return lines, lambda prepared: (function(prepared), size)[1]
+    return case
+
+
+def _case_parse_line(lines):
+    size = _line_bytes(lines)
+
+    def run(prepared):
+        for line in prepared:
+            parse_qdma_log_line(line)
+        return size
+    return lines, run
+
+
+def _case_detect(lines):
+    data = "\n".join(lines).encode('utf-8')
+    return data, lambda prepared: (detect_format(sample_stream_lines(io.BytesIO(prepared))), len(prepared))[1]
+
+
+def _case_filter(lines):
+    events = parse_qdma_events(lines)
+    table = events_to_frame(events)
+    index = EventIndex.from_frame(table)
+    options = frame_filter_options(table)
+    functions = sorted(options['functions'])[::2]
+    threads = sorted(options['threads'])[:1]
+    size = _line_bytes(lines)
+
+    def run(prepared):
+        rows = prepared.select(functions, None, ['entering', 'exiting'], threads)
+        [events[i] for i in rows]
+        return size
+    return index, run
+
+
+def _case_encode(lines):
+    puml = qdma_events_to_puml(parse_qdma_events(lines))
+    return puml, lambda prepared: (encode_plantuml(prepared), len(prepared))[1]
+
+
+# name -> (log format to generate, case)
+CASES: Dict[str, Tuple[str, Case]] = {
+    'parse_qdma_log_line': ('qdma', _case_parse_line),
+    'parse_qdma_log_to_puml': ('qdma', _run_lines(parse_qdma_log_to_puml)),
+    'parse_qdma_log_to_activity_puml': ('qdma', _run_lines(parse_qdma_log_to_activity_puml)),
+    'parse_qdma_log_to_component_puml': ('qdma', _run_lines(parse_qdma_log_to_component_puml)),
+    'parse_log_to_puml': ('legacy', _run_lines(parse_log_to_puml)),
+    'parse_log_to_activity_puml': ('legacy', _run_lines(parse_log_to_activity_puml)),
+    'parse_log_to_component_puml': ('legacy', _run_lines(parse_log_to_component_puml)),
+    'detect_format': ('qdma', _case_detect),
+    'filter_select': ('qdma', _case_filter),
+    'encode_plantuml': ('qdma', _case_encode),
+}
+
+# Log generator per format a case reads
+GENERATORS = {'qdma': generate_qdma_lines, 'legacy': generate_legacy_lines}
+
+
+def measure(case: Case, lines: List[str], repeat: int) -> Dict[str, float]:
+    """Best wall time over `repeat` runs, then one traced run for peak memory above the prepared input"""
+    prepared, run = case(lines)
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        size = run(prepared)
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run(prepared)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds': best,
+        'lines_per_s': len(lines) / best if best else 0.0,
+        'mb_per_s': size / best / 1e6 if best else 0.0,
+        'peak_mb': peak / 1e6,
+    }
+
+
+def git_revision() -> Tuple[str, bool]:
+    """Short commit hash of the working tree and whether it has uncommitted changes"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def run_benchmarks(sizes: List[int], cases: List[str], repeat: int, seed: int) -> List[dict]:
+    results = []
+    needed = {CASES[name][0] for name in cases}
+    for size in sizes:
+        # Only the formats the selected cases read, so a qdma-only run does not hold a legacy log too
+        logs = {log_format: list(GENERATORS[log_format](size, seed=seed)) for log_format in needed}
+        for name in cases:
+            log_format, case = CASES[name]
+            row = {'case': name, 'lines': size}
+            row.update(measure(case, logs[log_format], repeat))
+            results.append(row)
+            print(f"{name:36} {size:>10,} lines  {row['seconds']:9.4f} s  {row['lines_per_s']:>13,.0f} lines/s  "
+                  f"{row['mb_per_s']:8.1f} MB/s  {row['peak_mb']:9.1f} MB peak")
+        # Released before the next size is generated, so two sizes never sit in memory together
+        del logs
+        gc.collect()
+    return results
+
+
+def results_path(commit: str) -> str:
+    return os.path.join(RESULTS_DIR, f"{commit}.json")
+
+
+def save_results(results: List[dict], commit: str, dirty: bool) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = results_path(commit + ('-dirty' if dirty else ''))
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump({
+            'commit': commit,
+            'dirty': dirty,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'results': results,
+        }, handle, indent=2)
+    return path
+
+
+def compare(results: List[dict], baseline_ref: str) -> None:
+    """Print the speedup of each case against a stored run (ratio > 1 means faster now)"""
+    with open(results_path(baseline_ref), encoding='utf-8') as handle:
+        baseline = {(row['case'], row['lines']): row for row in json.load(handle)['results']}
+    print(f"\nCompared with {baseline_ref}:")
+    for row in results:
+        old = baseline.get((row['case'], row['lines']))
+        if old is None:
+            continue
+        speedup = old['seconds'] / row['seconds'] if row['seconds'] else float('inf')
+        memory = row['peak_mb'] / old['peak_mb'] if old['peak_mb'] else float('nan')
+        flag = "  <-- slower" if speedup < 0.9 else ""
+        print(f"{row['case']:36} {row['lines']:>10,} lines  x{speedup:6.2f} speed  x{memory:6.2f} memory{flag}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the log visualizer parsers and generators")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="Log sizes in lines (e.g. 10000 1000000 10000000)")
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case; the best is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', metavar='COMMIT', help="Stored run to compare against (file name in results/)")
+    parser.add_argument('--no-save', action='store_true', help="Do not store the results")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.cases, args.repeat, args.seed)
+    if not args.no_save:
+        commit, dirty = git_revision()
+        print(f"\nSaved {save_results(results, commit, dirty)}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
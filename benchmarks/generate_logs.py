@@ -0,0 +1,119 @@
+import argparse
+import random
+import sys
+from typing import Iterator, List, Optional
+
+
+QDMA_FUNCTIONS = [
+    'qdma_open', 'qdma_release', 'qdma_ioctl', 'qdma_queue_add', 'qdma_queue_start', 'qdma_queue_stop',
+    'qdma_queue_del', 'qdma_desc_fill', 'qdma_desc_free', 'qdma_irq_handler', 'qdma_mbox_send',
+    'qdma_mbox_recv', 'qdma_csr_read', 'qdma_csr_write', 'qdma_dev_config', 'qdma_dma_map',
+]
+
+LEGACY_FUNCTIONS = ['init', 'load_config', 'open_device', 'read_block', 'write_block', 'flush', 'close_device']
+
+NOISE_LINES = [
+    "usb 1-1: new high-speed USB device number {n} using xhci_hcd",
+    "EXT4-fs (sda1): mounted filesystem with ordered data mode",
+    "e1000e 0000:00:1f.6 eno1: NIC Link is Up 1000 Mbps Full Duplex",
+    "audit: type=1400 audit({n}.123:{n}): apparmor=\"STATUS\"",
+]
+
+
+def generate_qdma_lines(lines: int,
+                        depth: int = 4,
+                        threads: int = 4,
+                        modules: int = 2,
+                        noise: float = 0.2,
+                        seed: int = 0) -> Iterator[str]:
+    """Yield a reproducible QDMA driver log of exactly `lines` lines.
+
+    Each thread walks its own call stack (at most `depth` frames) and threads interleave at
+    random; `noise` is the share of unrelated kernel lines, and about one line in twenty of
+    the rest is a driver info line or a user command.
+    """
+    rng = random.Random(seed)
+    module_names = ['qdma_pf', 'qdma_vf'][:modules] + [f"qdma_mod{i}" for i in range(2, modules)]
+    stacks: List[List[str]] = [[] for _ in range(threads)]
+    timestamp = 100.0
+    for n in range(lines):
+        timestamp += rng.randint(1, 50) / 1e6
+        ts = f"[{timestamp:.6f}]"
+        roll = rng.random()
+        if roll < noise:
+            yield f"{ts} " + rng.choice(NOISE_LINES).format(n=n)
+            continue
+        if roll < noise + 0.05 * (1 - noise):
+            if rng.random() < 0.5:
+                yield f"{ts} Command: dma-ctl qdma{rng.randint(0, 3):02d}000 q add idx {rng.randint(0, 255)}"
+            else:
+                yield f"{ts} {rng.choice(module_names)}:{rng.choice(QDMA_FUNCTIONS)}: irq status 0x{rng.getrandbits(16):04x}"
+            continue
+        thread = rng.randrange(threads)
+        stack = stacks[thread]
+        module = module_names[thread % len(module_names)]
+        thread_id = 100 + thread
+        if stack and (len(stack) >= depth or rng.random() < 0.45):
+            function = stack.pop()
+            caller = stack[-1] if stack else 'qdma_ioctl'
+            yield (f"{ts} {module}:{caller}: ----- QDMA exiting the {function} function at "
+                   f"drivers/qdma/{function}.c:{len(function) * 7} [Thread ID: {thread_id}] -----")
+        else:
+            function = rng.choice(QDMA_FUNCTIONS)
+            caller = stack[-1] if stack else 'qdma_ioctl'
+            stack.append(function)
+            yield (f"{ts} {module}:{caller}: ----- QDMA entering the {function} function at "
+                   f"drivers/qdma/{function}.c:{len(function) * 7} [Thread ID: {thread_id}] -----")
+
+
+def generate_legacy_lines(lines: int, depth: int = 3, noise: float = 0.1, seed: int = 0) -> Iterator[str]:
+    """Yield a reproducible legacy "Function X is called/completed" log of exactly `lines` lines"""
+    rng = random.Random(seed)
+    stack: List[str] = []
+    for _ in range(lines):
+        roll = rng.random()
+        if roll < noise:
+            yield rng.choice(["some info", "checkpoint reached", "cache warmed up"])
+        elif roll < noise + 0.05:
+            function = rng.choice(LEGACY_FUNCTIONS)
+            yield rng.choice([f"Retrying Function {function}", f"Function {function} caused error",
+                              f"Function {function} is skipped"])
+        elif stack and (len(stack) >= depth or rng.random() < 0.45):
+            yield f"Function {stack.pop()} is completed"
+        else:
+            function = rng.choice(LEGACY_FUNCTIONS)
+            stack.append(function)
+            yield f"Function {function} is called"
+
+
+def write_log(path: Optional[str], log_lines: Iterator[str]) -> None:
+    handle = open(path, 'w', encoding='utf-8', newline='\n') if path else sys.stdout
+    try:
+        for line in log_lines:
+            handle.write(line)
+            handle.write('\n')
+    finally:
+        if path:
+            handle.close()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic QDMA or legacy log")
+    parser.add_argument('--format', choices=('qdma', 'legacy'), default='qdma')
+    parser.add_argument('--lines', type=int, default=10_000)
+    parser.add_argument('--depth', type=int, default=4, help="Maximum call depth")
+    parser.add_argument('--threads', type=int, default=4, help="Thread count (QDMA only)")
+    parser.add_argument('--modules', type=int, default=2, help="Module count (QDMA only)")
+    parser.add_argument('--noise', type=float, default=0.2, help="Share of unrelated lines")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+    if args.format == 'qdma':
+        log_lines = generate_qdma_lines(args.lines, args.depth, args.threads, args.modules, args.noise, args.seed)
+    else:
+        log_lines = generate_legacy_lines(args.lines, args.depth, args.noise, args.seed)
+    write_log(args.output, log_lines)
+
+
+if __name__ == '__main__':
+    main()
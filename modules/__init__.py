@@ -1,3 +1,3 @@
-"""Utility package for code refactoring app."""
+"""Utility package for the code refactoring and log visualizer apps."""
 
 
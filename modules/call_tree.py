@@ -0,0 +1,228 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from modules.log_events import LogEvent
+
+
+# Below this many call events the process pool costs more than it saves
+PARALLEL_MIN_EVENTS = 200_000
+
+# (timestamp, function, action) records of one thread, as shipped to a worker
+ShardRecord = Tuple[float, str, str]
+
+# (parent position, name, count, first_enter, last_exit, total_time) per node in pre-order; how trees
+# travel back from workers, since pickling nested nodes recurses once per level of call depth
+FlatNode = Tuple[int, str, int, Optional[float], Optional[float], float]
+
+
+class CallNode:
+    """One calling context in a per-thread call tree.
+
+    `count` is how many times this context was entered; `first_enter`/`last_exit` are the
+    earliest entry and latest exit timestamps; `total_time` sums the enter->exit durations
+    of the calls that exited (inclusive of children).
+    """
+    __slots__ = ('name', 'children', 'count', 'first_enter', 'last_exit', 'total_time')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.children: Dict[str, "CallNode"] = {}
+        self.count = 0
+        self.first_enter: Optional[float] = None
+        self.last_exit: Optional[float] = None
+        self.total_time = 0.0
+
+    def __repr__(self) -> str:
+        return f"CallNode({self.name!r}, count={self.count}, children={len(self.children)})"
+
+    def child(self, name: str) -> "CallNode":
+        node = self.children.get(name)
+        if node is None:
+            node = self.children[name] = CallNode(name)
+        return node
+
+    def walk(self, path: Tuple[str, ...] = ()) -> Iterator[Tuple[Tuple[str, ...], "CallNode"]]:
+        """Yield (path, node) for every descendant in depth-first order; the root itself is not included"""
+        stack = [(path + (child.name,), child) for child in reversed(list(self.children.values()))]
+        while stack:
+            node_path, node = stack.pop()
+            yield node_path, node
+            stack.extend((node_path + (child.name,), child) for child in reversed(list(node.children.values())))
+
+    def _fields(self) -> dict:
+        return {
+            'name': self.name,
+            'count': self.count,
+            'first_enter': self.first_enter,
+            'last_exit': self.last_exit,
+            'total_time': self.total_time,
+        }
+
+    def to_dict(self) -> dict:
+        """Nested plain-dict form for JSON export, built without recursion"""
+        root = self._fields()
+        pending = [(self, root)]
+        while pending:
+            node, out = pending.pop()
+            out['children'] = []
+            for child in node.children.values():
+                child_out = child._fields()
+                out['children'].append(child_out)
+                pending.append((child, child_out))
+        return root
+
+    def flatten(self) -> List[FlatNode]:
+        """Pre-order (parent position, fields...) records; the root has parent -1"""
+        flat: List[FlatNode] = []
+        pending: List[Tuple[int, "CallNode"]] = [(-1, self)]
+        while pending:
+            parent, node = pending.pop()
+            position = len(flat)
+            flat.append((parent, node.name, node.count, node.first_enter, node.last_exit, node.total_time))
+            pending.extend((position, child) for child in reversed(list(node.children.values())))
+        return flat
+
+    @classmethod
+    def from_flat(cls, flat: List[FlatNode]) -> "CallNode":
+        """Rebuild a tree from flatten() output, children in their original order"""
+        nodes: List[CallNode] = []
+        for parent, name, count, first_enter, last_exit, total_time in flat:
+            node = cls(name)
+            node.count = count
+            node.first_enter = first_enter
+            node.last_exit = last_exit
+            node.total_time = total_time
+            if parent >= 0:
+                nodes[parent].children[name] = node
+            nodes.append(node)
+        return nodes[0]
+
+
+def shard_by_thread(events: Iterable[LogEvent]) -> Dict[Hashable, List[ShardRecord]]:
+    """Group entering/exiting events by thread (see LogEvent.thread_key), keeping each thread's order"""
+    shards: Dict[Hashable, List[ShardRecord]] = {}
+    for event in events:
+        if event.thread_id is None or event.action not in ('entering', 'exiting'):
+            continue
+        thread_key = event.thread_key()
+        shard = shards.get(thread_key)
+        if shard is None:
+            shard = shards[thread_key] = []
+        shard.append((event.timestamp, event.function, event.action))
+    return shards
+
+
+def build_thread_tree(records: List[ShardRecord], name: str = "root") -> CallNode:
+    """Build the call tree of one thread from its (timestamp, function, action) records.
+
+    An exit that does not match the innermost frame closes every frame above the matching
+    one (their exits were not logged); an exit with no matching frame is ignored.
+    """
+    root = CallNode(name)
+    # Stack of (node, enter timestamp)
+    stack: List[Tuple[CallNode, float]] = []
+    for timestamp, function, action in records:
+        if action == 'entering':
+            parent = stack[-1][0] if stack else root
+            node = parent.child(function)
+            node.count += 1
+            if node.first_enter is None:
+                node.first_enter = timestamp
+            stack.append((node, timestamp))
+            if root.first_enter is None:
+                root.first_enter = timestamp
+        else:
+            depth = len(stack) - 1
+            while depth >= 0 and stack[depth][0].name != function:
+                depth -= 1
+            if depth < 0:
+                continue
+            while len(stack) > depth:
+                node, entered = stack.pop()
+                node.total_time += timestamp - entered
+                node.last_exit = timestamp
+            root.last_exit = timestamp
+    root.total_time = sum(child.total_time for child in root.children.values())
+    return root
+
+
+def _build_shard(task: Tuple[Hashable, List[ShardRecord]]) -> Tuple[Hashable, CallNode]:
+    thread_id, records = task
+    return thread_id, build_thread_tree(records, f"thread {thread_id}")
+
+
+def _build_shard_flat(task: Tuple[Hashable, List[ShardRecord]]) -> Tuple[Hashable, List[FlatNode]]:
+    thread_id, tree = _build_shard(task)
+    return thread_id, tree.flatten()
+
+
+def build_call_trees(events: Iterable[LogEvent], workers: Optional[int] = None) -> Dict[Hashable, CallNode]:
+    """Build one call tree per thread ID; large inputs are built across a process pool"""
+    shards = shard_by_thread(events)
+    total = sum(len(records) for records in shards.values())
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(shards) <= 1 or total < PARALLEL_MIN_EVENTS:
+        return dict(_build_shard(task) for task in shards.items())
+    # Biggest shards first so one long thread does not finish last
+    tasks = sorted(shards.items(), key=lambda item: len(item[1]), reverse=True)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        flat_trees = dict(executor.map(_build_shard_flat, tasks))
+    return {thread_id: CallNode.from_flat(flat_trees[thread_id]) for thread_id in shards}
+
+
+def call_edge_counts(trees: Dict[Hashable, CallNode]) -> Dict[Tuple[str, str], int]:
+    """Caller->callee call counts summed over all threads (top-level calls have no caller)"""
+    edges: Dict[Tuple[str, str], int] = {}
+    for tree in trees.values():
+        for path, node in tree.walk():
+            if len(path) > 1:
+                edge = (path[-2], node.name)
+                edges[edge] = edges.get(edge, 0) + node.count
+    return edges
+
+
+def call_tree_rows(trees: Dict[Hashable, CallNode]) -> List[dict]:
+    """Flatten call trees into one row per calling context, for tables and CSV export"""
+    rows = []
+    for thread_id, tree in trees.items():
+        for path, node in tree.walk():
+            rows.append({
+                'thread_id': thread_id,
+                'depth': len(path),
+                'path': " > ".join(path),
+                'function': node.name,
+                'calls': node.count,
+                'first_enter': node.first_enter,
+                'last_exit': node.last_exit,
+                'total_time': node.total_time,
+            })
+    return rows
+
+
+def call_trees_json(trees: Dict[Hashable, CallNode]) -> str:
+    """JSON export of all call trees ({thread: nested node}), written iteratively.
+
+    json.dumps recurses per nesting level, so deep trees (long runs of unclosed entries) are
+    emitted here node by node instead.
+    """
+    parts = ['{']
+    for number, (thread_id, tree) in enumerate(trees.items()):
+        parts.append(('' if not number else ', ') + json.dumps(str(thread_id)) + ': ')
+        # Items are nodes to open or literal text (closing brackets, separators) to emit
+        pending: List[object] = [tree]
+        while pending:
+            item = pending.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            parts.append(json.dumps(item._fields())[:-1] + ', "children": [')
+            pending.append(']}')
+            children = list(item.children.values())
+            for position in range(len(children) - 1, -1, -1):
+                pending.append(children[position])
+                if position:
+                    pending.append(', ')
+    parts.append('}')
+    return ''.join(parts)
@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+from modules.log_cache import LRUCache
+
+
+# One rendered page: PlantUML text and the image drawn from it (PNG bytes or SVG markup)
+DiagramPage = Tuple[str, Union[bytes, str]]
+
+DEFAULT_MEMORY_ENTRIES = 64
+DEFAULT_MEMORY_BYTES = 256 << 20
+DEFAULT_DISK_BYTES = 2 << 30
+
+# Marker for a filter whose selection covers every option, so "all selected" hashes the same however it was picked
+ALL_SELECTED = '*'
+
+
+def normalize_filters(selections: Dict[str, Optional[Sequence[Hashable]]],
+                      options: Dict[str, Sequence[Hashable]]) -> Dict[str, object]:
+    """Canonical form of a filter set: sorted string values, ALL_SELECTED for full selections.
+
+    Empty or missing selections stay empty lists, which EventIndex.select reads as "no filter".
+    """
+    normalized: Dict[str, object] = {}
+    for name in sorted(selections):
+        values = sorted({str(value) for value in selections[name] or ()})
+        every = {str(value) for value in options.get(name, ())}
+        normalized[name] = ALL_SELECTED if every and set(values) == every else values
+    return normalized
+
+
+def diagram_key(log_key: Hashable, diagram_type: str, settings: Dict[str, object],
+                filters: Optional[Dict[str, object]] = None) -> str:
+    """Stable hex key for one rendered diagram of one log under one set of render settings and filters"""
+    payload = json.dumps([str(log_key), diagram_type, settings, filters], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _page_cost(pages: List[DiagramPage]) -> int:
+    return sum(len(puml) + len(image) for puml, image in pages)
+
+
+class DiagramCache:
+    """Rendered diagrams (PUML text and images per page) in an in-memory LRU, with an optional disk tier.
+
+    Memory holds the most recently viewed diagrams up to `max_bytes`. With `directory` set, every
+    rendered diagram is also written there as plain .puml/.png/.svg files, one folder per key; a
+    memory miss is served from disk and the least recently used folders are removed past `disk_bytes`.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MEMORY_ENTRIES, max_bytes: int = DEFAULT_MEMORY_BYTES,
+                 directory: Optional[str] = None, disk_bytes: int = DEFAULT_DISK_BYTES):
+        self.memory = LRUCache(max_entries, max_bytes)
+        self.directory = directory
+        self.disk_bytes = disk_bytes
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[List[DiagramPage]]:
+        pages = self.memory.get(key)
+        if pages is None and self.directory:
+            pages = self._read(key)
+            if pages is not None:
+                self.memory.put(key, pages, cost=_page_cost(pages))
+        return pages
+
+    def put(self, key: str, pages: List[DiagramPage]) -> None:
+        self.memory.put(key, pages, cost=_page_cost(pages))
+        if self.directory:
+            self._write(key, pages)
+            self._evict_disk()
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.directory:
+            for name in os.listdir(self.directory):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def _read(self, key: str) -> Optional[List[DiagramPage]]:
+        try:
+            return self._read_folder(os.path.join(self.directory, key))
+        except FileNotFoundError:
+            # Missing, or evicted by another session while being read
+            return None
+
+    def _read_folder(self, folder: str) -> Optional[List[DiagramPage]]:
+        names = sorted(os.listdir(folder))
+        pages = []
+        for name in names:
+            stem, extension = os.path.splitext(name)
+            if extension != '.puml':
+                continue
+            with open(os.path.join(folder, name), encoding='utf-8') as handle:
+                puml = handle.read()
+            if os.path.exists(os.path.join(folder, stem + '.png')):
+                with open(os.path.join(folder, stem + '.png'), 'rb') as handle:
+                    image: Union[bytes, str] = handle.read()
+            else:
+                with open(os.path.join(folder, stem + '.svg'), encoding='utf-8') as handle:
+                    image = handle.read()
+            pages.append((puml, image))
+        os.utime(folder)  # folder mtime is the disk tier's recency
+        return pages or None
+
+    def _write(self, key: str, pages: List[DiagramPage]) -> None:
+        folder = os.path.join(self.directory, key)
+        # Sessions share this cache, so each writer gets its own partial folder
+        partial = tempfile.mkdtemp(prefix=key + '.', suffix='.tmp', dir=self.directory)
+        for number, (puml, image) in enumerate(pages, 1):
+            stem = os.path.join(partial, f"page-{number:04d}")
+            with open(stem + '.puml', 'w', encoding='utf-8') as handle:
+                handle.write(puml)
+            if isinstance(image, bytes):
+                with open(stem + '.png', 'wb') as handle:
+                    handle.write(image)
+            else:
+                with open(stem + '.svg', 'w', encoding='utf-8') as handle:
+                    handle.write(image)
+        # Readers only ever see complete folders
+        shutil.rmtree(folder, ignore_errors=True)
+        try:
+            os.replace(partial, folder)
+        except OSError:
+            # Another session put the same diagram back first; its copy is just as good
+            shutil.rmtree(partial, ignore_errors=True)
+
+    def _evict_disk(self) -> None:
+        folders = []
+        total = 0
+        for name in os.listdir(self.directory):
+            folder = os.path.join(self.directory, name)
+            if name.endswith('.tmp') or not os.path.isdir(folder):
+                continue
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(folder))
+                folders.append((os.stat(folder).st_mtime_ns, size, folder))
+            except FileNotFoundError:
+                continue  # removed by another session meanwhile
+            total += size
+        for _, size, folder in sorted(folders):
+            if total <= self.disk_bytes:
+                break
+            shutil.rmtree(folder, ignore_errors=True)
+            total -= size
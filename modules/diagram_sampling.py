@@ -0,0 +1,244 @@
+import math
+import random
+from collections import Counter
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple, Union
+
+from modules.log_diagrams import ENTER_ACTIONS, EXIT_ACTIONS, ActivityDiagram, SequenceDiagram, build_diagram
+from modules.log_events import LogEvent
+
+
+SAMPLE_STRIDE = 'stride'
+SAMPLE_RESERVOIR = 'reservoir'
+SAMPLE_FIRST_LAST = 'first_last'
+
+SAMPLING_MODES = (SAMPLE_STRIDE, SAMPLE_RESERVOIR, SAMPLE_FIRST_LAST)
+
+
+class _Call:
+    """One entering..exiting span of a thread: its events are the entry, the children and the exit"""
+    __slots__ = ('enter', 'exit', 'function', 'size', 'children')
+
+    def __init__(self, enter: int, function: str):
+        self.enter = enter
+        self.exit: Optional[int] = None
+        self.function = function
+        self.size = 1
+        self.children: List["_Unit"] = []
+
+
+# A unit is a whole call subtree, or the index of a single event outside any matched pair
+_Unit = Union[_Call, int]
+
+
+class SampleReport:
+    """What a bounded diagram left out"""
+    __slots__ = ('mode', 'budget', 'total', 'kept', 'dropped_functions')
+
+    def __init__(self, mode: str, budget: int, total: int, kept: int, dropped_functions: Counter):
+        self.mode = mode
+        self.budget = budget
+        self.total = total
+        self.kept = kept
+        self.dropped_functions = dropped_functions
+
+    @property
+    def dropped(self) -> int:
+        return self.total - self.kept
+
+    def summary(self, top: int = 3) -> str:
+        most = ", ".join(f"{name} ({count:,})" for name, count in self.dropped_functions.most_common(top))
+        return (f"{self.dropped:,} of {self.total:,} events dropped ({self.mode} sampling to {self.budget:,})"
+                + (f"; most dropped: {most}" if most else ""))
+
+
+def _size(unit: _Unit) -> int:
+    return 1 if isinstance(unit, int) else unit.size
+
+
+def _function(unit: _Unit, events: Sequence[LogEvent]) -> str:
+    return events[unit].function if isinstance(unit, int) else unit.function
+
+
+def call_units(events: Sequence[LogEvent]) -> List[_Unit]:
+    """Top-level units in log order: each thread's outermost call subtrees and the events outside any call.
+
+    Entries and exits pair up per thread the way the diagram builders pair them (an exit closes
+    the innermost open call of the same function); calls still open at the end keep what they hold.
+    """
+    roots: List[_Unit] = []
+    stacks: Dict[Hashable, List[_Call]] = {}
+    for index, event in enumerate(events):
+        action = event.action
+        stack = stacks.get(event.thread_key())
+        if stack is None:
+            stack = stacks[event.thread_key()] = []
+        if action in EXIT_ACTIONS and stack and stack[-1].function == event.function:
+            call = stack.pop()
+            call.exit = index
+            call.size += 1
+            if stack:
+                stack[-1].size += call.size
+            continue
+        unit: _Unit = _Call(index, event.function) if action in ENTER_ACTIONS else index
+        if stack:
+            stack[-1].children.append(unit)
+            if isinstance(unit, int):
+                stack[-1].size += 1
+        else:
+            roots.append(unit)
+        if isinstance(unit, _Call):
+            stack.append(unit)
+    for stack in stacks.values():
+        # Calls that never exited: fold their sizes into their callers
+        while len(stack) > 1:
+            call = stack.pop()
+            stack[-1].size += call.size
+    return roots
+
+
+def _collect(unit: _Unit, kept: List[int]) -> None:
+    """Append every event index of a unit"""
+    pending = [unit]
+    while pending:
+        unit = pending.pop()
+        if isinstance(unit, int):
+            kept.append(unit)
+            continue
+        kept.append(unit.enter)
+        if unit.exit is not None:
+            kept.append(unit.exit)
+        pending.extend(unit.children)
+
+
+def _candidates(units: List[_Unit], budget: int, total: int, mode: str, rng: random.Random,
+                events: Sequence[LogEvent]) -> List[_Unit]:
+    """Units to try, in order of preference, for one level of the call forest"""
+    if mode == SAMPLE_STRIDE:
+        return units[::max(1, math.ceil(total / budget))]
+    if mode == SAMPLE_RESERVOIR:
+        # Algorithm R over whole subtrees: every unit is equally likely to be kept
+        wanted = max(1, math.ceil(len(units) * budget / total))
+        reservoir = units[:wanted]
+        for seen in range(wanted, len(units)):
+            slot = rng.randrange(seen + 1)
+            if slot < wanted:
+                reservoir[slot] = units[seen]
+        return reservoir
+    if mode == SAMPLE_FIRST_LAST:
+        # First, last, second, second-to-last... occurrence of every function, round by round
+        by_function: Dict[str, List[int]] = {}
+        for position, unit in enumerate(units):
+            by_function.setdefault(_function(unit, events), []).append(position)
+        ranked = []
+        for positions in by_function.values():
+            for rank in range((len(positions) + 1) // 2):
+                ranked.append((2 * rank, positions[rank]))
+                if len(positions) - 1 - rank != rank:
+                    ranked.append((2 * rank + 1, positions[-1 - rank]))
+        ranked.sort()
+        return [units[position] for _, position in ranked]
+    raise ValueError(f"Unknown sampling mode: {mode}")
+
+
+def _open_level(units: List[_Unit], budget: int, frame: int, mode: str, rng: random.Random,
+                events: Sequence[LogEvent], kept: List[int]) -> Union[int, list]:
+    """Keep `units` whole if they fit (returns the count kept), else a level to sample:
+    [candidates, next position, remaining budget, budget, frame cost charged to the parent]"""
+    total = sum(_size(unit) for unit in units)
+    if total <= budget:
+        for unit in units:
+            _collect(unit, kept)
+        return total
+    return [_candidates(units, budget, total, mode, rng, events), 0, budget, budget, frame]
+
+
+def _sample(units: List[_Unit], budget: int, mode: str, rng: random.Random,
+            events: Sequence[LogEvent], kept: List[int]) -> int:
+    """Keep at most `budget` events of `units`; returns how many were kept.
+
+    A unit is kept whole when it fits. One that does not keeps its entry and exit and is
+    sampled one level down with a fair share of what is left, so call stacks stay balanced.
+    Levels live on an explicit stack: lost exit lines can nest a whole thread arbitrarily deep.
+    """
+    level = _open_level(units, budget, 0, mode, rng, events, kept)
+    if isinstance(level, int):
+        return level
+    levels = [level]
+    while True:
+        level = levels[-1]
+        candidates, position, remaining = level[0], level[1], level[2]
+        if position >= len(candidates) or remaining <= 0:
+            levels.pop()
+            used = level[3] - level[2]
+            if not levels:
+                return used
+            levels[-1][2] -= level[4] + used
+            continue
+        level[1] += 1
+        unit = candidates[position]
+        size = _size(unit)
+        if size <= remaining:
+            _collect(unit, kept)
+            level[2] -= size
+            continue
+        frame = 1 if unit.exit is None else 2
+        share = max(remaining // (len(candidates) - position), frame + 1)
+        if share > remaining:
+            continue
+        kept.append(unit.enter)
+        if unit.exit is not None:
+            kept.append(unit.exit)
+        child = _open_level(unit.children, share - frame, frame, mode, rng, events, kept)
+        if isinstance(child, int):
+            level[2] -= frame + child
+        else:
+            levels.append(child)
+
+
+def sample_events(events: Sequence[LogEvent], max_events: int, mode: str = SAMPLE_STRIDE,
+                  seed: int = 0) -> Tuple[List[LogEvent], Optional[SampleReport]]:
+    """Representative subset of at most `max_events` events, in log order, with balanced call stacks.
+
+    stride keeps every k-th top-level call subtree, reservoir a uniform random sample of whole
+    subtrees, first_last the first and last occurrences of each function. Returns the events
+    unchanged and no report when they already fit.
+    """
+    if len(events) <= max_events:
+        return list(events), None
+    kept: List[int] = []
+    _sample(call_units(events), max_events, mode, random.Random(seed), events, kept)
+    kept.sort()
+    keep = bytearray(len(events))
+    for index in kept:
+        keep[index] = 1
+    dropped = Counter(event.function for event, flag in zip(events, keep) if not flag)
+    report = SampleReport(mode, max_events, len(events), len(kept), dropped)
+    return [events[index] for index in kept], report
+
+
+def annotate_diagram(diagram, report: SampleReport):
+    """Mark a diagram built from sampled events: the title says so and a note lists what was dropped"""
+    diagram.title = f"{diagram.title or 'Diagram'} [sampled: {report.kept:,} of {report.total:,} events, {report.mode}]"
+    if isinstance(diagram, SequenceDiagram):
+        # After the participant declarations, so paging keeps them on every page
+        position = 0
+        while position < len(diagram.steps) and diagram.steps[position][0] == 'participant':
+            position += 1
+        anchor = diagram.steps[0][1] if diagram.steps and diagram.steps[0][0] == 'participant' else "User"
+        diagram.steps = diagram.steps[:position] + [('note_over', anchor, report.summary())] + diagram.steps[position:]
+        if diagram.threads is not None:
+            diagram.threads = diagram.threads[:position] + [None] + diagram.threads[position:]
+    elif isinstance(diagram, ActivityDiagram):
+        diagram.steps = [('note', report.summary())] + diagram.steps
+    return diagram
+
+
+def build_bounded_diagram(log_format: str, diagram_type: str, events: Sequence[LogEvent],
+                          compress_loops: bool = False, max_events: Optional[int] = None,
+                          mode: str = SAMPLE_STRIDE, seed: int = 0):
+    """build_diagram on at most `max_events` sampled events (no limit when None or 0), annotated when sampled"""
+    if not max_events:
+        return build_diagram(log_format, diagram_type, list(events), compress_loops)
+    sampled, report = sample_events(events, max_events, mode, seed)
+    diagram = build_diagram(log_format, diagram_type, sampled, compress_loops)
+    return annotate_diagram(diagram, report) if report is not None else diagram
@@ -0,0 +1,92 @@
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from modules.call_tree import CallNode
+
+
+WEIGHT_DURATION = 'duration'
+WEIGHT_COUNT = 'count'
+
+# Frames narrower than this share of the whole graph are left out of the in-app chart
+DEFAULT_MIN_FRACTION = 0.001
+
+
+def _self_weight(node: CallNode, weight: str) -> int:
+    """Weight of a node excluding its children: self time in microseconds, or its call count"""
+    if weight == WEIGHT_COUNT:
+        return node.count
+    child_time = sum(child.total_time for child in node.children.values())
+    return max(int(round((node.total_time - child_time) * 1e6)), 0)
+
+
+def folded_stacks(trees: Dict[Hashable, CallNode], weight: str = WEIGHT_DURATION,
+                  include_thread: bool = True) -> Dict[str, int]:
+    """Collapse call trees into folded stacks ("a;b;c" -> weight), as read by flamegraph.pl and speedscope.
+
+    Duration weights are self times in whole microseconds; count weights are calls per context.
+    With include_thread each stack starts with a "thread <id>" frame.
+    """
+    stacks: Dict[str, int] = {}
+    for tree in trees.values():
+        prefix = (tree.name,) if include_thread else ()
+        for path, node in tree.walk(prefix):
+            value = _self_weight(node, weight)
+            if value:
+                key = ";".join(path)
+                stacks[key] = stacks.get(key, 0) + value
+    return stacks
+
+
+def folded_text(stacks: Dict[str, int]) -> str:
+    """Render folded stacks one "stack weight" line each"""
+    return "".join(f"{stack} {value}\n" for stack, value in stacks.items())
+
+
+def flame_layout(trees: Dict[Hashable, CallNode], weight: str = WEIGHT_DURATION,
+                 min_fraction: float = DEFAULT_MIN_FRACTION) -> List[dict]:
+    """Place every frame as a rectangle for a flame graph: one row per frame with x0/x1 span and depth.
+
+    Thread roots sit at depth 0; a frame is as wide as its own weight plus its children's.
+    """
+    # Inclusive widths by node id, filled in iterative post-order so deep chains do not hit the recursion limit
+    widths: Dict[int, int] = {}
+    for tree in trees.values():
+        stack: List[Tuple[CallNode, bool]] = [(tree, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                widths[id(node)] = _self_weight(node, weight) + sum(
+                    widths[id(child)] for child in node.children.values())
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in node.children.values())
+
+    total = sum(widths[id(tree)] for tree in trees.values())
+    if not total:
+        return []
+    cutoff = total * min_fraction
+    rows: List[dict] = []
+    offset = 0
+    for tree in trees.values():
+        # (node, depth, x0, parent path)
+        pending: List[Tuple[CallNode, int, int, Optional[str]]] = [(tree, 0, offset, None)]
+        while pending:
+            node, depth, x0, parent = pending.pop()
+            span = widths[id(node)]
+            if span < cutoff or not span:
+                continue
+            path = node.name if parent is None else f"{parent};{node.name}"
+            rows.append({
+                'name': node.name,
+                'stack': path,
+                'depth': depth,
+                'x0': x0,
+                'x1': x0 + span,
+                'weight': span,
+                'share': span / total,
+            })
+            child_x = x0
+            for child in node.children.values():
+                pending.append((child, depth + 1, child_x, path))
+                child_x += widths[id(child)]
+        offset += widths[id(tree)]
+    return rows
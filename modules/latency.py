@@ -0,0 +1,107 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.call_tree import ShardRecord, shard_by_thread
+from modules.log_events import LogEvent
+
+
+LATENCY_COLUMNS = ['function', 'count', 'total_us', 'mean_us', 'p50_us', 'p95_us', 'p99_us', 'max_us']
+
+PERCENTILES = (0.50, 0.95, 0.99)
+
+
+class CallDurations:
+    """Per-call durations in seconds, as parallel arrays: function code, inclusive and exclusive time"""
+
+    def __init__(self, functions: List[str], codes: np.ndarray, inclusive: np.ndarray, exclusive: np.ndarray):
+        self.functions = functions
+        self.codes = codes
+        self.inclusive = inclusive
+        self.exclusive = exclusive
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def _thread_durations(records: List[ShardRecord], code_of: Dict[str, int],
+                      codes: List[int], inclusive: List[float], exclusive: List[float]) -> None:
+    """Match one thread's enter/exit records and append a (code, inclusive, exclusive) entry per completed call"""
+    # Frames are [function, enter timestamp, time spent in completed children]
+    stack: List[list] = []
+    for timestamp, function, action in records:
+        if action == 'entering':
+            stack.append([function, timestamp, 0.0])
+            continue
+        depth = len(stack) - 1
+        while depth >= 0 and stack[depth][0] != function:
+            depth -= 1
+        if depth < 0:
+            continue  # exit whose entry is not in the log
+        # Frames above the match lost their exit line; they are closed at this timestamp
+        while len(stack) > depth:
+            name, entered, child_time = stack.pop()
+            elapsed = timestamp - entered
+            code = code_of.get(name)
+            if code is None:
+                code = code_of[name] = len(code_of)
+            codes.append(code)
+            inclusive.append(elapsed)
+            exclusive.append(elapsed - child_time)
+            if stack:
+                stack[-1][2] += elapsed
+
+
+def call_durations(events: Iterable[LogEvent]) -> CallDurations:
+    """Pair entering/exiting events per thread and measure every completed call"""
+    code_of: Dict[str, int] = {}
+    codes: List[int] = []
+    inclusive: List[float] = []
+    exclusive: List[float] = []
+    for records in shard_by_thread(events).values():
+        _thread_durations(records, code_of, codes, inclusive, exclusive)
+    return CallDurations(list(code_of),
+                         np.asarray(codes, dtype=np.int64),
+                         np.asarray(inclusive, dtype=np.float64),
+                         np.asarray(exclusive, dtype=np.float64))
+
+
+def _group_percentile(sorted_values: np.ndarray, starts: np.ndarray, counts: np.ndarray, q: float) -> np.ndarray:
+    """Linear-interpolated percentile of every group in a group-wise sorted array"""
+    position = starts + q * (counts - 1)
+    low = np.floor(position).astype(np.int64)
+    high = np.ceil(position).astype(np.int64)
+    fraction = position - low
+    return sorted_values[low] * (1.0 - fraction) + sorted_values[high] * fraction
+
+
+def latency_table(durations: CallDurations, exclusive: bool = False) -> pd.DataFrame:
+    """Hot-function table (microseconds) from call durations, slowest total first"""
+    if not len(durations):
+        return pd.DataFrame(columns=LATENCY_COLUMNS)
+    values = (durations.exclusive if exclusive else durations.inclusive) * 1e6
+    # One sort orders calls by function, then by duration inside each function
+    order = np.lexsort((values, durations.codes))
+    sorted_codes = durations.codes[order]
+    sorted_values = values[order]
+    present = np.flatnonzero(np.bincount(sorted_codes, minlength=len(durations.functions)))
+    counts = np.bincount(sorted_codes)[present]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    totals = np.add.reduceat(sorted_values, starts)
+    table = pd.DataFrame({
+        'function': [durations.functions[code] for code in present],
+        'count': counts,
+        'total_us': totals,
+        'mean_us': totals / counts,
+    })
+    for q in PERCENTILES:
+        table[f"p{int(q * 100)}_us"] = _group_percentile(sorted_values, starts, counts, q)
+    table['max_us'] = sorted_values[starts + counts - 1]
+    return table.sort_values('total_us', ascending=False, ignore_index=True)
+
+
+def latency_profile(events: Iterable[LogEvent]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Inclusive and exclusive hot-function tables for a QDMA event list"""
+    durations = call_durations(events)
+    return latency_table(durations), latency_table(durations, exclusive=True)
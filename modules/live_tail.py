@@ -0,0 +1,137 @@
+from typing import List, Optional, Tuple
+
+from modules.log_diagrams import (
+    DEFAULT_PAGE_STEPS,
+    QDMA_BUILDERS,
+    ComponentDiagram,
+    SequenceDiagram,
+    _page_title,
+    _split_steps,
+    compress_sequence,
+    paginate_diagram,
+)
+from modules.log_events import _NameDecoder, parse_qdma_events_bytes
+from modules.log_formats import classify_line, registered_formats
+from modules.log_io import LogTail
+
+
+def first_specific_format(raw_lines: List[bytes]) -> Optional[str]:
+    """Name of the first non-fallback registered format that claims one of the lines, else None.
+
+    Boot noise only matches the plain dmesg fallback, so it never settles the format of a capture.
+    """
+    formats = [log_format for log_format in registered_formats() if not log_format.fallback]
+    for raw in raw_lines:
+        name, _ = classify_line(raw.decode('utf-8', 'replace').rstrip('\r'), formats)
+        if name is not None:
+            return name
+    return None
+
+
+class LiveDiagram:
+    """Follow a growing QDMA log and extend one diagram with each batch of appended lines.
+
+    Only the bytes written since the previous refresh are read and parsed, and the builder
+    keeps its call stacks, participants and edges, so a refresh costs O(new lines).
+
+    Steps are only ever appended, so the diagram is paged in fixed chunks of `page_steps`
+    messages: a chunk the log has moved past never changes, and its folded pages are kept.
+    Each refresh only rebuilds the last, still open chunk.
+    """
+
+    def __init__(self, path: str, diagram_type: str):
+        self.path = path
+        self.diagram_type = diagram_type
+        self.tail = LogTail(path)
+        self._reset()
+
+    def _reset(self) -> None:
+        # The format is decided again after truncation; the file may have been restarted with other content
+        self.log_format: Optional[str] = None
+        self.names = _NameDecoder()
+        self.builder = QDMA_BUILDERS[self.diagram_type]()
+        self.event_count = 0
+        # Step index kept up to date as steps are appended: participant positions and
+        # declarations (as _split_steps takes them) and the positions of all other steps
+        self._scanned = 0
+        self._participants: Tuple[List[int], List[tuple]] = ([], [])
+        self._body: List[int] = []
+        self._page_settings: Optional[Tuple[int, bool]] = None
+        self._chunk_pages: List[list] = []  # pages of each complete chunk
+
+    def refresh(self) -> int:
+        """Parse newly appended lines into the diagram; returns the number of new events"""
+        raw_lines = self.tail.poll()
+        if self.tail.truncated:
+            self._reset()
+        if not raw_lines:
+            return 0
+        if self.log_format is None:
+            # Undecided until a poll holds a line some specific format recognises
+            self.log_format = first_specific_format(raw_lines)
+            if self.log_format is None:
+                return 0
+        if self.log_format != "qdma":
+            return 0
+        events = parse_qdma_events_bytes(raw_lines, self.names)
+        self.builder.feed(events)
+        self.event_count += len(events)
+        return len(events)
+
+    def diagram(self):
+        return self.builder.diagram()
+
+    def pages(self, page_steps: int = DEFAULT_PAGE_STEPS, compress_loops: bool = False,
+              last: Optional[int] = None) -> Tuple[list, int]:
+        """The newest `last` pages (all when None) and the total page count.
+
+        Loops are folded within each chunk, so a repetition never spans a page boundary.
+        """
+        diagram = self.diagram()
+        if isinstance(diagram, ComponentDiagram):
+            return [diagram], 1
+        compress_loops = compress_loops and isinstance(diagram, SequenceDiagram)
+        if self._page_settings != (page_steps, compress_loops):
+            self._page_settings = (page_steps, compress_loops)
+            self._chunk_pages = []
+        self._scan(diagram)
+
+        body = self._body
+        # A chunk is complete once a later step exists, which fixes where it ends
+        while len(body) > (len(self._chunk_pages) + 1) * page_steps:
+            self._chunk_pages.append(self._paginate(diagram, len(self._chunk_pages), page_steps, compress_loops))
+        pages = [page for chunk in self._chunk_pages for page in chunk]
+        if len(body) > len(self._chunk_pages) * page_steps or not pages:
+            pages.extend(self._paginate(diagram, len(self._chunk_pages), page_steps, compress_loops))
+
+        total = len(pages)
+        first = 0 if last is None else max(total - last, 0)
+        shown = []
+        for number, page in enumerate(pages[first:], first + 1):
+            page.title = _page_title(diagram.title, number, total) if total > 1 else diagram.title
+            shown.append(page)
+        return shown, total
+
+    def _scan(self, diagram) -> None:
+        steps = diagram.steps
+        positions, declarations = self._participants
+        is_sequence = isinstance(diagram, SequenceDiagram)
+        for position in range(self._scanned, len(steps)):
+            step = steps[position]
+            if is_sequence and step[0] == 'participant':
+                positions.append(position)
+                declarations.append(step)
+            else:
+                self._body.append(position)
+        self._scanned = len(steps)
+
+    def _paginate(self, diagram, chunk: int, page_steps: int, compress_loops: bool) -> list:
+        """Pages of one chunk of `page_steps` messages, folded and halved like any other diagram"""
+        body = self._body
+        first = chunk * page_steps
+        start = body[first] if first else 0
+        end = body[first + page_steps] if first + page_steps < len(body) else len(diagram.steps)
+        page = _split_steps(diagram, start, end, self._participants)
+        if compress_loops:
+            page = compress_sequence(page)
+        return paginate_diagram(page, page_steps)
@@ -0,0 +1,80 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, BinaryIO, Hashable, Optional, Tuple
+
+from modules.log_io import DEFAULT_CHUNK_SIZE
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count and by a caller-supplied cost per entry.
+
+    Safe to share between threads (Streamlit sessions share cache_resource objects).
+    """
+
+    def __init__(self, max_entries: int = 8, max_cost: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_cost = max_cost
+        self.total_cost = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, cost: int = 1) -> None:
+        with self._lock:
+            if key in self._entries:
+                self.total_cost -= self._entries.pop(key)[1]
+            if self.max_cost is not None and cost > self.max_cost:
+                return  # would evict everything and still not fit
+            self._entries[key] = (value, cost)
+            self.total_cost += cost
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_cost = 0
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 (self.max_cost is not None and self.total_cost > self.max_cost)):
+            _, (_, cost) = self._entries.popitem(last=False)
+            self.total_cost -= cost
+
+
+def stream_digest(stream: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """Hash a seekable binary stream chunk by chunk and rewind it"""
+    digest = hashlib.blake2b(digest_size=16)
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def text_digest(text: str) -> str:
+    """Hash pasted log text"""
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).hexdigest()
+
+
+def file_fingerprint(path: str) -> str:
+    """Cheap identity for a file on disk: resolved path, size and modification time.
+
+    Used instead of a content hash for local files, which may be tens of GB.
+    """
+    stat = os.stat(path)
+    return f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
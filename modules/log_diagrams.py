@@ -0,0 +1,737 @@
+import base64
+import re
+import urllib.request
+from bisect import bisect_left
+import zlib
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from modules.log_events import LogEvent, parse_legacy_events, parse_qdma_events
+
+
+# --------------------------
+# PlantUML URL Generator
+# --------------------------
+# PlantUML's base64 variant is standard base64 with a different alphabet, so the whole buffer
+# is encoded in C and translated in one call. Padding '=' maps to '0', which is exactly what
+# zero-filling the last 3-byte group produces in the PlantUML alphabet.
+_BASE64_ALPHABET = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/='
+_PLANTUML_ALPHABET = b'0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz-_0'
+_BASE64_TO_PLANTUML = bytes.maketrans(_BASE64_ALPHABET, _PLANTUML_ALPHABET)
+
+# Longest encoded diagram we put in a URL; beyond this servers and browsers start rejecting requests
+MAX_ENCODED_LENGTH = 8000
+# Default number of diagram steps (messages, notes, actions) per page
+DEFAULT_PAGE_STEPS = 500
+
+
+def encode_plantuml(text: str) -> str:
+    """Deflate and encode PlantUML text for a server URL"""
+    compressed = zlib.compress(text.encode('utf-8'))[2:-4]  # strip zlib header/footer
+    return base64.b64encode(compressed).translate(_BASE64_TO_PLANTUML).decode('ascii')
+
+
+def get_plantuml_image_url(uml_code, server="http://www.plantuml.com/plantuml/png/"):
+    encoded = encode_plantuml(uml_code)
+    return server + encoded
+
+
+def fetch_plantuml_image(uml_code: str, server: str = "http://www.plantuml.com/plantuml/png/",
+                         timeout: float = 30) -> bytes:
+    """Download the rendered image for PlantUML text.
+
+    Raises HTTPError when the server rejects the text (its body is PlantUML's error image) and
+    another OSError (URLError, timeout) when the server cannot be reached.
+    """
+    with urllib.request.urlopen(get_plantuml_image_url(uml_code, server), timeout=timeout) as response:
+        return response.read()
+
+
+# --------------------------
+# Diagram models
+# --------------------------
+# Builders turn events / lines into these small models; emitters turn a model into
+# PlantUML text (below) or SVG (modules.svg_render), so both outputs always agree.
+
+class SequenceDiagram:
+    """Sequence diagram as an ordered list of steps.
+
+    Steps are tuples: ('participant', name), ('call', source, target, label),
+    ('return', source, target, label), ('note_over', name, text), ('note_right', name, text),
+    and ('loop', count, steps) for a block of steps repeated `count` times.
+
+    `threads`, when known, runs parallel to `steps` with the thread key each step came from
+    (None for declarations and thread-less notes), so repeats can be found per thread.
+    """
+    __slots__ = ('title', 'steps', 'threads')
+
+    def __init__(self, title: Optional[str] = None, steps: Optional[List[tuple]] = None,
+                 threads: Optional[List[Hashable]] = None):
+        self.title = title
+        self.steps = steps if steps is not None else []
+        self.threads = threads
+
+    def participants(self) -> List[str]:
+        return [step[1] for step in self.steps if step[0] == 'participant']
+
+
+class ActivityDiagram:
+    """Activity diagram as an ordered list of ('action', text) / ('note', text) steps"""
+    __slots__ = ('title', 'steps')
+
+    def __init__(self, title: Optional[str] = None, steps: Optional[List[tuple]] = None):
+        self.title = title
+        self.steps = steps if steps is not None else []
+
+
+class ComponentDiagram:
+    """Component diagram: package -> component names (None for top level) and counted edges"""
+    __slots__ = ('title', 'packages', 'edges')
+
+    def __init__(self, title: Optional[str] = None,
+                 packages: Optional[Dict[Optional[str], Set[str]]] = None,
+                 edges: Optional[Dict[Tuple[str, str], int]] = None):
+        self.title = title
+        self.packages = packages if packages is not None else {}
+        self.edges = edges if edges is not None else {}
+
+
+# Names PlantUML accepts unquoted; anything else (dmesg subsystems such as "usb-storage") is declared under an alias
+_PLAIN_NAME = re.compile(r'[A-Za-z_]\w*', re.ASCII)
+
+
+def _puml_aliases(names: Iterable[str], reserved: Iterable[str] = ()) -> Dict[str, str]:
+    """PlantUML reference per name: plain names stay as they are, others get a unique plain alias"""
+    names = list(dict.fromkeys(names))
+    reserved = set(reserved)
+    taken = {name for name in names if _PLAIN_NAME.fullmatch(name) and name not in reserved} | reserved
+    aliases = {}
+    for name in names:
+        if _PLAIN_NAME.fullmatch(name) and name not in reserved:
+            aliases[name] = name
+            continue
+        base = re.sub(r'\W', '_', name, flags=re.ASCII)
+        if not _PLAIN_NAME.fullmatch(base):
+            base = '_' + base
+        alias = base
+        suffix = 2
+        while alias in taken:
+            alias = f"{base}_{suffix}"
+            suffix += 1
+        taken.add(alias)
+        aliases[name] = alias
+    return aliases
+
+
+def _quoted(name: str) -> str:
+    return '"' + name.replace('"', "'") + '"'
+
+
+def _sequence_steps_to_puml(steps: List[tuple], plantuml_lines: List[str], aliases: Dict[str, str],
+                            indent: str = "") -> None:
+    for step in steps:
+        kind = step[0]
+        if kind == 'participant':
+            alias = aliases[step[1]]
+            if alias == step[1]:
+                plantuml_lines.append(f"{indent}participant {alias}")
+            else:
+                plantuml_lines.append(f"{indent}participant {_quoted(step[1])} as {alias}")
+        elif kind == 'call':
+            plantuml_lines.append(f"{indent}{aliases[step[1]]}->{aliases[step[2]]}: {step[3]}")
+        elif kind == 'return':
+            plantuml_lines.append(f"{indent}{aliases[step[1]]}-->{aliases[step[2]]}: {step[3]}")
+        elif kind == 'note_over':
+            plantuml_lines.append(f"{indent}note over {aliases[step[1]]}: {step[2]}")
+        elif kind == 'note_right':
+            plantuml_lines.append(f"{indent}note right of {aliases[step[1]]}: {step[2]}")
+        elif kind == 'loop':
+            plantuml_lines.append(f"{indent}loop {step[1]} times")
+            _sequence_steps_to_puml(step[2], plantuml_lines, aliases, indent + "  ")
+            plantuml_lines.append(f"{indent}end")
+
+
+class _ParticipantAliases(dict):
+    """Aliases of the declared participants; a name used without a declaration is quoted in place"""
+
+    def __missing__(self, name: str) -> str:
+        return name if _PLAIN_NAME.fullmatch(name) else _quoted(name)
+
+
+def sequence_to_puml(diagram: SequenceDiagram) -> str:
+    """Emit PlantUML for a sequence diagram model"""
+    plantuml_lines = ["@startuml"]
+    if diagram.title:
+        plantuml_lines.append(f"title {diagram.title}")
+    aliases = _ParticipantAliases(_puml_aliases(diagram.participants()))
+    _sequence_steps_to_puml(diagram.steps, plantuml_lines, aliases)
+    plantuml_lines.append("@enduml")
+    return "\n".join(plantuml_lines)
+
+
+def activity_to_puml(diagram: ActivityDiagram) -> str:
+    """Emit PlantUML for an activity diagram model"""
+    plantuml_lines = ["@startuml"]
+    if diagram.title:
+        plantuml_lines.append(f"title {diagram.title}")
+    plantuml_lines.append("start")
+    for kind, text in diagram.steps:
+        if kind == 'action':
+            plantuml_lines.append(f":{text};")
+        else:
+            plantuml_lines.append(f"note right: {text}")
+    plantuml_lines.append("stop")
+    plantuml_lines.append("@enduml")
+    return "\n".join(plantuml_lines)
+
+
+def component_to_puml(diagram: ComponentDiagram) -> str:
+    """Emit PlantUML for a component diagram model; edges carry a count label when repeated"""
+    plantuml_lines = ["@startuml"]
+    if diagram.title:
+        plantuml_lines.append(f"title {diagram.title}")
+
+    components = sorted({component for members in diagram.packages.values() for component in members}
+                        | {name for edge in diagram.edges for name in edge})
+    aliases = _puml_aliases(components)
+    packages = sorted(name for name in diagram.packages if name is not None)
+    # A package may share its name with a component (dmesg subsystems are both), so it is aliased apart
+    package_aliases = _puml_aliases(packages, reserved=aliases.values())
+
+    def declare(component: str) -> str:
+        alias = aliases[component]
+        if alias == component:
+            return f"component {alias}"
+        return f"component [{component.replace('[', '(').replace(']', ')')}] as {alias}"
+
+    # Add components
+    for component in sorted(diagram.packages.get(None, ())):
+        plantuml_lines.append(declare(component))
+    for package in packages:
+        alias = package_aliases[package]
+        if alias == package:
+            plantuml_lines.append(f"package {package} {{")
+        else:
+            plantuml_lines.append(f"package {_quoted(package)} as {alias} {{")
+        for component in sorted(diagram.packages[package]):
+            plantuml_lines.append(f"  {declare(component)}")
+        plantuml_lines.append("}")
+
+    # Add interactions, in first-seen order
+    for (source, target), count in diagram.edges.items():
+        if count > 1:
+            plantuml_lines.append(f"{aliases[source]} --> {aliases[target]} : {count} calls")
+        else:
+            plantuml_lines.append(f"{aliases[source]} --> {aliases[target]}")
+
+    plantuml_lines.append("@enduml")
+    return "\n".join(plantuml_lines)
+
+
+# --------------------------
+# Repeated call-pattern compression
+# --------------------------
+
+# Longest block of steps checked for back-to-back repetition
+MAX_LOOP_PERIOD = 64
+
+
+def compress_repeats(steps: List[tuple], max_period: int = MAX_LOOP_PERIOD) -> List[tuple]:
+    """Replace back-to-back repetitions of a block of steps with ('loop', count, block).
+
+    Greedy left-to-right scan: at each position the block length covering the most steps
+    wins (shorter block on ties), and block bodies are compressed again so nested
+    repetitions become nested loops. Identical consecutive notes collapse the same way.
+    """
+    return [step for _, step in _compress_runs(steps, max_period)]
+
+
+def _compress_runs(steps: List[tuple], max_period: int) -> List[Tuple[int, tuple]]:
+    """compress_repeats, with the position in `steps` where each output step or loop starts"""
+    compressed = []
+    i = 0
+    n = len(steps)
+    while i < n:
+        best_period, best_count = 0, 1
+        first = steps[i]
+        for period in range(1, min(max_period, (n - i) // 2) + 1):
+            # Cheap single-element check before comparing whole blocks
+            if steps[i + period] != first:
+                continue
+            block = steps[i:i + period]
+            count = 1
+            while i + (count + 1) * period <= n and steps[i + count * period:i + (count + 1) * period] == block:
+                count += 1
+            if count > 1 and count * period > best_count * best_period:
+                best_period, best_count = period, count
+        if best_count > 1:
+            body = compress_repeats(steps[i:i + best_period], max_period)
+            compressed.append((i, ('loop', best_count, body)))
+            i += best_count * best_period
+        else:
+            compressed.append((i, first))
+            i += 1
+    return compressed
+
+
+def compress_sequence(diagram: SequenceDiagram, max_period: int = MAX_LOOP_PERIOD) -> SequenceDiagram:
+    """Collapse repeated call patterns of a sequence diagram into PlantUML loop groups.
+
+    With per-step threads, each thread's steps are folded on their own, so interleaved threads
+    do not break each other's repetitions; the folded steps and loops of all threads are then
+    put back in the order of the step each one starts at.
+    """
+    # Declarations are hoisted (in order) so a first-seen participant never breaks a repetition
+    declared = [step for step in diagram.steps if step[0] == 'participant']
+    if diagram.threads is None:
+        body = [step for step in diagram.steps if step[0] != 'participant']
+        return SequenceDiagram(diagram.title, declared + compress_repeats(body, max_period))
+
+    streams: Dict[Hashable, Tuple[List[int], List[tuple]]] = {}
+    for position, (step, thread) in enumerate(zip(diagram.steps, diagram.threads)):
+        if step[0] == 'participant':
+            continue
+        stream = streams.get(thread)
+        if stream is None:
+            stream = streams[thread] = ([], [])
+        stream[0].append(position)
+        stream[1].append(step)
+    placed = []
+    for positions, steps in streams.values():
+        placed.extend((positions[start], step) for start, step in _compress_runs(steps, max_period))
+    placed.sort(key=lambda item: item[0])
+    return SequenceDiagram(diagram.title, declared + [step for _, step in placed])
+
+
+# --------------------------
+# QDMA diagram builders (operate on parsed LogEvent lists)
+# --------------------------
+
+# Legacy lines say called/completed where QDMA lines say entering/exiting; a mixed log holds both
+ENTER_ACTIONS = frozenset(('entering', 'called'))
+EXIT_ACTIONS = frozenset(('exiting', 'completed'))
+# Legacy actions that do not move a call stack, shown as notes on their function
+NOTE_ACTIONS = frozenset(('error', 'retry', 'skipped'))
+
+class QdmaSequenceBuilder:
+    """Resumable QDMA sequence builder: participants, steps and per-thread call stacks persist
+    between feed() calls, so appended events extend the diagram without replaying history."""
+
+    title = "QDMA Driver Function Call Sequence"
+
+    def __init__(self):
+        self.steps: List[tuple] = [('participant', 'User')]
+        self.threads: List[Hashable] = [None]  # thread key of each step, for per-thread loop folding
+        self.participants: Set[str] = set(["User"])
+        self.call_stacks: Dict[Hashable, List[str]] = {}
+
+    def feed(self, events: Iterable[LogEvent]) -> "QdmaSequenceBuilder":
+        steps = self.steps
+        threads = self.threads
+        participants = self.participants
+        call_stacks = self.call_stacks
+
+        for event in events:
+            func_name = event.function
+            action = event.action
+            thread_key = event.thread_key()
+
+            if not func_name:
+                # A legacy line that names no function has only its text to show
+                if event.message:
+                    steps.append(('note_right', "User", f"{event.message.strip()[:50]}..."))
+                    threads.append(thread_key)
+                continue
+
+            # Add participant if new
+            if func_name not in participants:
+                steps.append(('participant', func_name))
+                threads.append(None)
+                participants.add(func_name)
+
+            entering = action in ENTER_ACTIONS
+            if entering or action in EXIT_ACTIONS:
+                call_stack = call_stacks.get(thread_key)
+                if call_stack is None:
+                    call_stack = call_stacks[thread_key] = []
+
+            if entering:
+                caller = call_stack[-1] if call_stack else "User"
+                steps.append(('call', caller, func_name, action))
+                threads.append(thread_key)
+                call_stack.append(func_name)
+
+            elif action in EXIT_ACTIONS:
+                if call_stack and call_stack[-1] == func_name:
+                    call_stack.pop()
+                    caller = call_stack[-1] if call_stack else "User"
+                    steps.append(('return', func_name, caller, action))
+                    threads.append(thread_key)
+
+            elif action == 'command':
+                steps.append(('note_over', "User", event.message or ''))
+                threads.append(thread_key)
+
+            elif action == 'info':
+                if event.message:
+                    steps.append(('note_right', func_name, f"{event.message[:50]}..."))
+                    threads.append(thread_key)
+
+            elif action in NOTE_ACTIONS:
+                steps.append(('note_right', func_name, action.upper()))
+                threads.append(thread_key)
+        return self
+
+    def diagram(self) -> SequenceDiagram:
+        """Current model; it shares the builder's step and thread lists rather than copying them"""
+        return SequenceDiagram(self.title, self.steps, self.threads)
+
+
+def build_qdma_sequence(events: Iterable[LogEvent]) -> SequenceDiagram:
+    """Build the QDMA function-call sequence model; each thread keeps its own call stack"""
+    return QdmaSequenceBuilder().feed(events).diagram()
+
+
+class QdmaActivityBuilder:
+    """Resumable QDMA activity builder; activity steps need no state beyond the step list"""
+
+    title = "QDMA Driver Activity Flow"
+
+    def __init__(self):
+        self.steps: List[tuple] = []
+
+    def feed(self, events: Iterable[LogEvent]) -> "QdmaActivityBuilder":
+        steps = self.steps
+        for event in events:
+            func_name = event.function
+            action = event.action
+
+            if not func_name:
+                # A legacy line that names no function has only its text to show
+                if event.message:
+                    steps.append(('note', f"{event.message.strip()[:40]}..."))
+            elif action in ENTER_ACTIONS:
+                steps.append(('action', f"Enter {func_name}"))
+            elif action in EXIT_ACTIONS:
+                steps.append(('action', f"Exit {func_name}"))
+            elif action == 'command':
+                steps.append(('action', f"Execute Command\\n{(event.message or '')[:30]}..."))
+            elif action == 'info' and event.message:
+                steps.append(('note', f"{event.message[:40]}..."))
+            elif action in NOTE_ACTIONS:
+                steps.append(('note', f"{func_name} {action}"))
+        return self
+
+    def diagram(self) -> ActivityDiagram:
+        return ActivityDiagram(self.title, self.steps)
+
+
+def build_qdma_activity(events: Iterable[LogEvent]) -> ActivityDiagram:
+    """Build the QDMA activity-flow model"""
+    return QdmaActivityBuilder().feed(events).diagram()
+
+
+class QdmaComponentBuilder:
+    """Resumable QDMA component builder in a single pass per feed() call.
+
+    Module membership and caller->callee edges (from each thread's call stack) are
+    collected together; each edge is kept once with its call count.
+    """
+
+    title = "QDMA Driver Component Interaction"
+
+    def __init__(self):
+        self.module_functions: Dict[Optional[str], Set[str]] = {}
+        self.edge_counts: Dict[Tuple[str, str], int] = {}
+        self.call_stacks: Dict[Hashable, List[str]] = {}
+
+    def feed(self, events: Iterable[LogEvent]) -> "QdmaComponentBuilder":
+        module_functions = self.module_functions
+        edge_counts = self.edge_counts
+        call_stacks = self.call_stacks
+
+        for event in events:
+            func_name = event.function
+            if not func_name:
+                continue
+            # Legacy lines have no module (''); their functions sit at the top level
+            module = event.module or None
+            functions = module_functions.get(module)
+            if functions is None:
+                functions = module_functions[module] = set()
+            functions.add(func_name)
+
+            action = event.action
+            entering = action in ENTER_ACTIONS
+            if entering or action in EXIT_ACTIONS:
+                thread_key = event.thread_key()
+                call_stack = call_stacks.get(thread_key)
+                if call_stack is None:
+                    call_stack = call_stacks[thread_key] = []
+
+            if entering:
+                if call_stack:
+                    edge = (call_stack[-1], func_name)
+                    edge_counts[edge] = edge_counts.get(edge, 0) + 1
+                call_stack.append(func_name)
+            elif action in EXIT_ACTIONS:
+                if call_stack and call_stack[-1] == func_name:
+                    call_stack.pop()
+        return self
+
+    def diagram(self) -> ComponentDiagram:
+        """Current model; it shares the builder's membership and edge tables"""
+        return ComponentDiagram(self.title, self.module_functions, self.edge_counts)
+
+
+def build_qdma_component(events: Iterable[LogEvent]) -> ComponentDiagram:
+    """Build the QDMA component model in a single pass"""
+    return QdmaComponentBuilder().feed(events).diagram()
+
+
+QDMA_BUILDERS = {
+    "Sequence Diagram": QdmaSequenceBuilder,
+    "Activity Diagram": QdmaActivityBuilder,
+    "Component Diagram": QdmaComponentBuilder,
+}
+
+
+def qdma_events_to_puml(events: Iterable[LogEvent]) -> str:
+    """Generate PlantUML sequence diagram from parsed QDMA events"""
+    return sequence_to_puml(build_qdma_sequence(events))
+
+
+def qdma_events_to_activity_puml(events: Iterable[LogEvent]) -> str:
+    """Generate PlantUML activity diagram from parsed QDMA events"""
+    return activity_to_puml(build_qdma_activity(events))
+
+
+def qdma_events_to_component_puml(events: Iterable[LogEvent]) -> str:
+    """Generate PlantUML component diagram from parsed QDMA events"""
+    return component_to_puml(build_qdma_component(events))
+
+
+def parse_qdma_log_to_puml(log_lines):
+    """Generate PlantUML sequence diagram for QDMA logs"""
+    return qdma_events_to_puml(parse_qdma_events(log_lines))
+
+
+def parse_qdma_log_to_activity_puml(log_lines):
+    """Generate PlantUML activity diagram for QDMA logs"""
+    return qdma_events_to_activity_puml(parse_qdma_events(log_lines))
+
+
+def parse_qdma_log_to_component_puml(log_lines):
+    """Generate PlantUML component diagram for QDMA logs"""
+    return qdma_events_to_component_puml(parse_qdma_events(log_lines))
+
+
+# --------------------------
+# Legacy parsers for backward compatibility
+# --------------------------
+
+def build_legacy_sequence(events: Iterable[LogEvent]) -> SequenceDiagram:
+    """Legacy sequence model from classified legacy lines"""
+    steps = [('participant', "Caller")]
+    participants = set(["Caller"])
+
+    for event in events:
+        fn = event.function
+        action = event.action
+        if fn and action:
+            if fn not in participants:
+                steps.append(('participant', fn))
+                participants.add(fn)
+
+            if action in ["entering", "called", "command", "retry"]:
+                steps.append(('call', "Caller", fn, action))
+            elif action in ["exiting", "completed"]:
+                steps.append(('return', fn, "Caller", action))
+            elif action in ["info", "error"]:
+                steps.append(('note_right', fn, action.upper()))
+            elif action == "skipped":
+                steps.append(('note_right', "Caller", f"Skipped {fn}"))
+        else:
+            steps.append(('note_right', "Caller", event.message.strip()))
+
+    return SequenceDiagram(None, steps)
+
+
+# Activity step per legacy action: (step kind, label template)
+_LEGACY_ACTIVITY_STEPS = {
+    'called': ('action', "Call {}"),
+    'completed': ('action', "Complete {}"),
+    'error': ('note', "{} error"),
+    'skipped': ('note', "{} skipped"),
+    'retry': ('action', "Retry {}"),
+}
+
+
+def build_legacy_activity(events: Iterable[LogEvent]) -> ActivityDiagram:
+    """Legacy activity model from classified legacy lines"""
+    steps = []
+    for event in events:
+        step = _LEGACY_ACTIVITY_STEPS.get(event.action) if event.function else None
+        if step is not None:
+            kind, label = step
+            steps.append((kind, label.format(event.function)))
+        else:
+            steps.append(('note', f"{event.message.strip()[:30]}..."))
+    return ActivityDiagram(None, steps)
+
+
+def build_legacy_component(events: Iterable[LogEvent]) -> ComponentDiagram:
+    """Legacy component model in one pass: every named function, with an edge for each call
+    made while another called function has not completed yet"""
+    components = set()
+    edges: Dict[Tuple[str, str], int] = {}
+    open_calls: List[str] = []
+    for event in events:
+        fn = event.function
+        if not fn:
+            continue
+        components.add(fn)
+        if event.action in ('called', 'entering'):
+            if open_calls:
+                edge = (open_calls[-1], fn)
+                edges[edge] = edges.get(edge, 0) + 1
+            open_calls.append(fn)
+        elif event.action in ('completed', 'exiting'):
+            if open_calls and open_calls[-1] == fn:
+                open_calls.pop()
+    return ComponentDiagram(None, {None: components}, edges)
+
+
+def parse_log_to_puml(log_lines):
+    return sequence_to_puml(build_legacy_sequence(parse_legacy_events(log_lines)))
+
+
+def parse_log_to_activity_puml(log_lines):
+    """Legacy activity parser"""
+    return activity_to_puml(build_legacy_activity(parse_legacy_events(log_lines)))
+
+
+def parse_log_to_component_puml(log_lines):
+    """Legacy component parser"""
+    return component_to_puml(build_legacy_component(parse_legacy_events(log_lines)))
+
+
+# --------------------------
+# Dispatch by log format / diagram type
+# --------------------------
+
+def build_diagram(log_format: str, diagram_type: str, events: List[LogEvent], compress_loops: bool = False):
+    """Build the diagram model for a log format and a UI diagram type label.
+
+    Legacy logs use the line-based legacy builders; every other format (QDMA, dmesg, mixed,
+    user-defined) yields LogEvents and goes through the event builders, which also read the
+    legacy actions found in mixed logs.
+    """
+    if compress_loops and diagram_type == "Sequence Diagram":
+        return compress_sequence(build_diagram(log_format, diagram_type, events))
+    if log_format == "legacy":
+        if diagram_type == "Sequence Diagram":
+            return build_legacy_sequence(events)
+        if diagram_type == "Activity Diagram":
+            return build_legacy_activity(events)
+        if diagram_type == "Component Diagram":
+            return build_legacy_component(events)
+    elif diagram_type in QDMA_BUILDERS:
+        return QDMA_BUILDERS[diagram_type]().feed(events).diagram()
+    raise ValueError(f"Unknown diagram type: {diagram_type}")
+
+
+def diagram_to_puml(diagram) -> str:
+    """Emit PlantUML for any diagram model"""
+    if isinstance(diagram, SequenceDiagram):
+        return sequence_to_puml(diagram)
+    if isinstance(diagram, ActivityDiagram):
+        return activity_to_puml(diagram)
+    return component_to_puml(diagram)
+
+
+# --------------------------
+# Paging of oversized diagrams
+# --------------------------
+
+def _page_title(title: Optional[str], number: int, total: int) -> str:
+    return f"{title or 'Diagram'} (page {number}/{total})"
+
+
+def _participant_index(diagram: SequenceDiagram) -> Tuple[List[int], List[tuple]]:
+    """Step positions of the participant declarations, and the declarations themselves, in order"""
+    positions = []
+    declarations = []
+    for position, step in enumerate(diagram.steps):
+        if step[0] == 'participant':
+            positions.append(position)
+            declarations.append(step)
+    return positions, declarations
+
+
+def _split_steps(diagram, start: int, end: int,
+                 participant_index: Optional[Tuple[List[int], List[tuple]]] = None):
+    """Copy of a sequence/activity diagram restricted to steps[start:end]"""
+    if isinstance(diagram, SequenceDiagram):
+        # Re-declare every participant seen so far so columns keep their order across pages;
+        # pass the diagram's _participant_index when splitting many pages so the prefix is not rescanned
+        positions, declarations = participant_index or _participant_index(diagram)
+        declared = declarations[:bisect_left(positions, end)]
+        body = [step for step in diagram.steps[start:end] if step[0] != 'participant']
+        threads = None
+        if diagram.threads is not None:
+            # Kept aligned so a page can still be folded per thread
+            threads = [None] * len(declared) + [thread for step, thread in
+                                                zip(diagram.steps[start:end], diagram.threads[start:end])
+                                                if step[0] != 'participant']
+        return SequenceDiagram(diagram.title, declared + body, threads)
+    return ActivityDiagram(diagram.title, diagram.steps[start:end])
+
+
+def paginate_diagram(diagram, max_steps: int = DEFAULT_PAGE_STEPS,
+                     max_encoded: Optional[int] = MAX_ENCODED_LENGTH) -> list:
+    """Split a sequence or activity diagram into numbered pages.
+
+    Pages hold at most `max_steps` steps; a page whose encoded PlantUML is still longer
+    than `max_encoded` is halved until it fits (or holds a single step). Component
+    diagrams are already deduplicated and are returned as a single page.
+    """
+    if isinstance(diagram, ComponentDiagram):
+        return [diagram]
+
+    steps = diagram.steps
+    if isinstance(diagram, SequenceDiagram):
+        # Participant declarations are repeated per page, so only the other steps count
+        positions = [i for i, step in enumerate(steps) if step[0] != 'participant']
+    else:
+        positions = list(range(len(steps)))
+    if len(positions) <= max_steps and (
+            max_encoded is None or len(encode_plantuml(diagram_to_puml(diagram))) <= max_encoded):
+        return [diagram]
+
+    # Step-count pages first, as [start, end) slices of the step list
+    ranges = []
+    for first in range(0, len(positions), max_steps):
+        start = positions[first] if first else 0
+        last = min(first + max_steps, len(positions))
+        end = positions[last] if last < len(positions) else len(steps)
+        ranges.append((start, end))
+
+    participant_index = _participant_index(diagram) if isinstance(diagram, SequenceDiagram) else None
+    pages = []
+    pending = list(reversed(ranges))
+    while pending:
+        start, end = pending.pop()
+        page = _split_steps(diagram, start, end, participant_index)
+        body = [i for i in range(start, end) if steps[i][0] != 'participant']
+        if max_encoded is not None and len(body) > 1 and \
+                len(encode_plantuml(diagram_to_puml(page))) > max_encoded:
+            middle = body[len(body) // 2]
+            pending.append((middle, end))
+            pending.append((start, middle))
+            continue
+        pages.append(page)
+
+    total = len(pages)
+    for number, page in enumerate(pages, 1):
+        page.title = _page_title(diagram.title, number, total)
+    return pages
@@ -0,0 +1,227 @@
+import re
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+
+# Pattern for QDMA log format: [timestamp] module:function: ----- QDMA entering/exiting the function_name function at path [Thread ID: xxx] -----
+QDMA_PATTERN = re.compile(r'\[([\d.]+)\]\s+(\w+):(\w+):\s+----- QDMA (entering|exiting) the (\w+) function at.*?\[Thread ID: (\d+)\]')
+
+# Alternative pattern for simpler QDMA logs
+SIMPLE_PATTERN = re.compile(r'\[([\d.]+)\]\s+(\w+):(\w+):\s+(.+)$')
+
+# Command pattern
+COMMAND_PATTERN = re.compile(r'\[([\d.]+)\]\s+Command:\s+(.+)$')
+
+# Byte-pattern versions of the above for raw lines read from a memory-mapped file.
+# Raw lines keep their terminator, so the trailing '\r' of CRLF logs is excluded explicitly.
+QDMA_PATTERN_BYTES = re.compile(rb'\[([\d.]+)\]\s+(\w+):(\w+):\s+----- QDMA (entering|exiting) the (\w+) function at.*?\[Thread ID: (\d+)\]')
+SIMPLE_PATTERN_BYTES = re.compile(rb'\[([\d.]+)\]\s+(\w+):(\w+):\s+(.+?)\r?$')
+COMMAND_PATTERN_BYTES = re.compile(rb'\[([\d.]+)\]\s+Command:\s+(.+?)\r?$')
+
+
+class LogEvent:
+    """Compact record for one parsed log line"""
+    __slots__ = ('timestamp', 'module', 'caller_func', 'function', 'action', 'thread_id', 'message', 'source')
+
+    def __init__(self, timestamp: float, module: str, caller_func: str, function: str,
+                 action: str, thread_id: Optional[int] = None, message: Optional[str] = None,
+                 source: Optional[str] = None):
+        self.timestamp = timestamp
+        self.module = module
+        self.caller_func = caller_func
+        self.function = function
+        self.action = action
+        self.thread_id = thread_id
+        self.message = message
+        # Name of the log the event came from when several logs are merged
+        self.source = source
+
+    def __repr__(self) -> str:
+        return (f"LogEvent({self.timestamp!r}, {self.module!r}, {self.caller_func!r}, {self.function!r}, "
+                f"{self.action!r}, {self.thread_id!r}, {self.message!r}"
+                + (f", source={self.source!r})" if self.source is not None else ")"))
+
+    def thread_key(self) -> Union[int, str, None]:
+        """Thread identity for call-stack tracking; qualified by source so merged logs never share a stack"""
+        if self.source is None or self.thread_id is None:
+            return self.thread_id
+        return f"{self.source}:{self.thread_id}"
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """Return the dict layout produced by parse_qdma_log_line"""
+        parsed = {
+            'module': self.module,
+            'caller_func': self.caller_func,
+            'function': self.function,
+            'action': self.action,
+            'thread_id': str(self.thread_id) if self.thread_id is not None else None,
+        }
+        if self.message is not None:
+            parsed['message'] = self.message
+        if self.source is not None:
+            parsed['source'] = self.source
+        return parsed
+
+
+def _to_timestamp(text) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return 0.0
+
+
+_intern = sys.intern
+
+
+def _has_module_prefix(line: Union[str, bytes], close: Union[str, bytes], colon: Union[str, bytes]) -> bool:
+    """Literal check for the "[timestamp] module:function:" shape of SIMPLE_PATTERN.
+
+    The first token after the closing bracket must hold two colons and end with one; dmesg
+    noise ("usb 1-1: ...", "audit: ...") fails here and never reaches the regex engine.
+    """
+    end = line.find(close)
+    if end < 0:
+        return False
+    head = line[end + 1:end + 129].split(None, 1)
+    return bool(head) and head[0].endswith(colon) and head[0].count(colon) >= 2
+
+
+def parse_qdma_event(line: str) -> Optional[LogEvent]:
+    """Parse one QDMA log line into a LogEvent, or None if it does not match"""
+    # Every pattern starts with a [timestamp]; the literal checks below keep noise lines out of the regex engine
+    if '[' not in line:
+        return None
+    match = QDMA_PATTERN.search(line) if '----- QDMA ' in line else None
+    if match:
+        ts, module, caller_func, action, func_name, thread_id = match.groups()
+        return LogEvent(_to_timestamp(ts), _intern(module), _intern(caller_func), _intern(func_name),
+                        _intern(action), int(thread_id))
+
+    match = SIMPLE_PATTERN.search(line) if _has_module_prefix(line, ']', ':') else None
+    if match:
+        ts, module, func_name, message = match.groups()
+        func_name = _intern(func_name)
+        return LogEvent(_to_timestamp(ts), _intern(module), func_name, func_name, 'info', None, message)
+
+    match = COMMAND_PATTERN.search(line) if 'Command:' in line else None
+    if match:
+        ts, command = match.groups()
+        return LogEvent(_to_timestamp(ts), 'system', 'command', 'command', 'command', None, command)
+
+    return None
+
+
+def parse_qdma_events(log_lines: Iterable[str]) -> List[LogEvent]:
+    """Parse QDMA log lines once into a list of LogEvent records"""
+    events = []
+    append = events.append
+    for line in log_lines:
+        event = parse_qdma_event(line)
+        if event is not None:
+            append(event)
+    return events
+
+
+class _NameDecoder(dict):
+    """Decode-and-intern cache for byte names; each distinct name is decoded once"""
+
+    def __missing__(self, raw: bytes) -> str:
+        name = self[raw] = _intern(raw.decode('utf-8', 'replace'))
+        return name
+
+
+def parse_qdma_event_bytes(raw: bytes, names: Optional[_NameDecoder] = None) -> Optional[LogEvent]:
+    """Parse one raw QDMA log line; only the captured fields are decoded"""
+    if b'[' not in raw:  # every pattern starts with a [timestamp]
+        return None
+    if names is None:
+        names = _NameDecoder()
+
+    match = QDMA_PATTERN_BYTES.search(raw) if b'----- QDMA ' in raw else None
+    if match:
+        ts, module, caller_func, action, func_name, thread_id = match.groups()
+        return LogEvent(_to_timestamp(ts), names[module], names[caller_func], names[func_name],
+                        names[action], int(thread_id))
+
+    match = SIMPLE_PATTERN_BYTES.search(raw) if _has_module_prefix(raw, b']', b':') else None
+    if match:
+        ts, module, func_name, message = match.groups()
+        func_name = names[func_name]
+        return LogEvent(_to_timestamp(ts), names[module], func_name, func_name, 'info', None,
+                        message.decode('utf-8', 'replace'))
+
+    match = COMMAND_PATTERN_BYTES.search(raw) if b'Command:' in raw else None
+    if match:
+        ts, command = match.groups()
+        return LogEvent(_to_timestamp(ts), 'system', 'command', 'command', 'command', None,
+                        command.decode('utf-8', 'replace'))
+
+    return None
+
+
+def parse_qdma_events_bytes(raw_lines: Iterable[bytes], names: Optional[_NameDecoder] = None) -> List[LogEvent]:
+    """Parse raw byte lines (e.g. from iter_mmap_lines) into a list of LogEvent records.
+
+    Pass the same `names` table across calls (e.g. when tailing a file) to keep sharing decoded names.
+    """
+    if names is None:
+        names = _NameDecoder()
+    events = []
+    append = events.append
+    for raw in raw_lines:
+        event = parse_qdma_event_bytes(raw, names)
+        if event is not None:
+            append(event)
+    return events
+
+
+LEGACY_ACTIONS = "entering|exiting|command|info|called|completed|error|retry|skipped"
+
+# One alternation finds the function of a legacy line in a single scan: a retry ("Retrying Function X")
+# or a function line with an optional action word after the name
+LEGACY_LINE_PATTERN = re.compile(
+    r"\bRetrying Function (?P<retried>\w+)"
+    rf"|\bFunction (?P<function>\w+)\b(?:.*?\b(?P<action>{LEGACY_ACTIONS})\b)?",
+    re.IGNORECASE)
+
+# Lines that name no function may still carry an action word
+LEGACY_BARE_ACTION_PATTERN = re.compile(rf"\b({LEGACY_ACTIONS})\b", re.IGNORECASE)
+
+
+def classify_legacy_line(line: str) -> Tuple[str, str]:
+    """(function, action) of a legacy line; either is '' when the line does not name one.
+
+    The function alternatives are searched first, so an action word in a prefix such as
+    "error: Function foo caused error" does not hide the function name.
+    """
+    match = LEGACY_LINE_PATTERN.search(line)
+    if match is not None:
+        retried, function, action = match.group('retried', 'function', 'action')
+        if retried:
+            return _intern(retried), 'retry'
+        return _intern(function), _intern(action.lower()) if action else ''
+    match = LEGACY_BARE_ACTION_PATTERN.search(line)
+    if match is None:
+        return '', ''
+    return '', _intern(match.group(1).lower())
+
+
+def parse_legacy_event(line: str) -> LogEvent:
+    """Classify one legacy log line; the raw line is kept as the message for the legacy generators"""
+    function, action = classify_legacy_line(line)
+    return LogEvent(0.0, '', function, function, action, None, line)
+
+
+def parse_legacy_events(log_lines: Iterable[str]) -> List[LogEvent]:
+    """Parse legacy log lines into one LogEvent per line"""
+    return [parse_legacy_event(line) for line in log_lines]
+
+
+def parse_qdma_log_line(line: str) -> Optional[Dict[str, Optional[str]]]:
+    """Parse QDMA log line to extract function name and action type"""
+    event = parse_qdma_event(line)
+    if event is None:
+        return None
+    parsed = event.to_dict()
+    parsed['full_line'] = line.strip()
+    return parsed
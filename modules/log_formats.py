@@ -0,0 +1,208 @@
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from modules.log_events import (
+    LogEvent,
+    _intern,
+    _to_timestamp,
+    parse_legacy_event,
+    parse_legacy_events,
+    parse_qdma_event,
+    parse_qdma_events,
+)
+
+
+# Plain kernel ring buffer line: "[   12.345678] subsystem: message" (the subsystem prefix is optional)
+DMESG_PATTERN = re.compile(r'^\s*\[\s*(\d+\.\d+)\]\s*(?:([\w.-]+):\s)?\s*(.*?)\s*$')
+
+# A detected format shorter than this share of the classified sample lines is treated as noise
+MIXED_MIN_SHARE = 0.05
+
+MIXED_FORMAT = "mixed"
+
+# Named groups a user-defined pattern may capture; all are optional
+USER_PATTERN_GROUPS = ('timestamp', 'module', 'function', 'action', 'thread', 'message')
+
+
+class LogFormat:
+    """A registered log format.
+
+    `markers` are literal substrings; a line is only handed to `parse_line` when it contains
+    one of them, so lines of other formats never reach the regex engine. Formats are tried in
+    ascending `priority`; a `fallback` format (plain dmesg) only wins detection when nothing
+    more specific matched.
+    """
+    __slots__ = ('name', 'label', 'markers', 'parse_line', 'priority', 'fallback')
+
+    def __init__(self, name: str, label: str, markers: Sequence[str],
+                 parse_line: Callable[[str], Optional[LogEvent]],
+                 priority: int = 50, fallback: bool = False):
+        self.name = name
+        self.label = label
+        self.markers = tuple(markers)
+        self.parse_line = parse_line
+        self.priority = priority
+        self.fallback = fallback
+
+    def __repr__(self) -> str:
+        return f"LogFormat({self.name!r}, markers={self.markers!r}, priority={self.priority})"
+
+    def claims(self, line: str) -> bool:
+        for marker in self.markers:
+            if marker in line:
+                return True
+        return False
+
+    def parse(self, line: str) -> Optional[LogEvent]:
+        """Parse a line if it passes the literal prefilter"""
+        if not self.claims(line):
+            return None
+        return self.parse_line(line)
+
+
+def parse_dmesg_event(line: str) -> Optional[LogEvent]:
+    """Parse a plain dmesg line; the subsystem prefix (or "kernel") stands in for module and function"""
+    match = DMESG_PATTERN.match(line)
+    if not match:
+        return None
+    ts, subsystem, message = match.groups()
+    subsystem = _intern(subsystem) if subsystem else 'kernel'
+    return LogEvent(_to_timestamp(ts), subsystem, subsystem, subsystem, 'info', None, message)
+
+
+def _parse_legacy_line(line: str) -> Optional[LogEvent]:
+    event = parse_legacy_event(line)
+    return event if event.function else None
+
+
+FORMAT_REGISTRY: Dict[str, LogFormat] = {}
+
+
+def register_format(log_format: LogFormat) -> LogFormat:
+    """Add (or replace) a format in the registry"""
+    FORMAT_REGISTRY[log_format.name] = log_format
+    return log_format
+
+
+def unregister_format(name: str) -> None:
+    FORMAT_REGISTRY.pop(name, None)
+
+
+def registered_formats(extra_formats: Sequence[LogFormat] = ()) -> List[LogFormat]:
+    """Registered formats plus `extra_formats` (e.g. one user's session-only formats), in dispatch order"""
+    formats = dict(FORMAT_REGISTRY)
+    formats.update((log_format.name, log_format) for log_format in extra_formats)
+    return sorted(formats.values(), key=lambda log_format: log_format.priority)
+
+
+register_format(LogFormat("qdma", "QDMA driver log", ("----- QDMA ", "qdma", "Command:"), parse_qdma_event, priority=10))
+register_format(LogFormat("legacy", "Legacy function log", ("Function ",), _parse_legacy_line, priority=20))
+register_format(LogFormat("dmesg", "Plain dmesg", ("] ",), parse_dmesg_event, priority=90, fallback=True))
+
+
+def regex_format(name: str, pattern: str, markers: Sequence[str] = (), label: Optional[str] = None,
+                 priority: int = 50) -> LogFormat:
+    """Build a user-defined format from a regex with named groups.
+
+    Recognised groups are timestamp, module, function, action, thread and message; a missing
+    module or function defaults to the format name, action to "info" and thread to none. Without markers every line
+    is offered to the regex.
+    """
+    compiled = re.compile(pattern)
+    unknown = set(compiled.groupindex) - set(USER_PATTERN_GROUPS)
+    if unknown:
+        raise ValueError(f"Unknown group(s) in pattern: {', '.join(sorted(unknown))}")
+
+    def parse_line(line: str) -> Optional[LogEvent]:
+        match = compiled.search(line)
+        if not match:
+            return None
+        fields = match.groupdict()
+        function = _intern(fields.get('function') or name)
+        thread = fields.get('thread')
+        return LogEvent(_to_timestamp(fields.get('timestamp') or '0'),
+                        _intern(fields.get('module') or name), function, function,
+                        _intern((fields.get('action') or 'info').lower()),
+                        int(thread) if thread and thread.isdigit() else None,
+                        fields.get('message') or line)
+
+    return LogFormat(name, label or name, tuple(markers) or ('',), parse_line, priority)
+
+
+def classify_line(line: str, formats: Optional[List[LogFormat]] = None) -> Tuple[Optional[str], Optional[LogEvent]]:
+    """Per-line dispatch: the first format (in priority order) whose prefilter and parser accept the line"""
+    for log_format in formats or registered_formats():
+        if log_format.claims(line):
+            event = log_format.parse_line(line)
+            if event is not None:
+                return log_format.name, event
+    return None, None
+
+
+def detect_format(sample_lines: Iterable[str], extra_formats: Sequence[LogFormat] = ()) -> str:
+    """Detect the format of a log from lines sampled across the whole file.
+
+    Returns a registry name, or "mixed" when more than one specific format holds a
+    meaningful share of the sample; logs nobody recognises fall back to "legacy".
+    """
+    formats = registered_formats(extra_formats)
+    counts: Dict[str, int] = {}
+    for line in sample_lines:
+        name, _ = classify_line(line, formats)
+        if name is not None:
+            counts[name] = counts.get(name, 0) + 1
+    fallbacks = {log_format.name for log_format in formats if log_format.fallback}
+    specific = {name: count for name, count in counts.items() if name not in fallbacks}
+    if not specific:
+        return max(counts, key=counts.get) if counts else "legacy"
+    classified = sum(specific.values())
+    significant = [name for name, count in specific.items() if count >= classified * MIXED_MIN_SHARE]
+    if len(significant) > 1:
+        return MIXED_FORMAT
+    return max(specific, key=specific.get)
+
+
+def parse_events(log_lines: Iterable[str], log_format: str, extra_formats: Sequence[LogFormat] = ()) -> List[LogEvent]:
+    """Parse log lines as one registered format, or dispatch every line separately for "mixed" logs"""
+    # The QDMA parser guards each of its patterns with its own literal checks (stricter than the
+    # registry markers), so the bulk parsers are called directly rather than through LogFormat.parse
+    if log_format == "qdma":
+        return parse_qdma_events(log_lines)
+    if log_format == "legacy":
+        return parse_legacy_events(log_lines)
+    if log_format == MIXED_FORMAT:
+        formats = registered_formats(extra_formats)
+        events = []
+        append = events.append
+        for line in log_lines:
+            _, event = classify_line(line, formats)
+            if event is not None:
+                append(event)
+        return events
+    parse = {f.name: f for f in registered_formats(extra_formats)}[log_format].parse
+    events = []
+    append = events.append
+    for line in log_lines:
+        event = parse(line)
+        if event is not None:
+            append(event)
+    return events
+
+
+def iter_events(log_lines: Iterable[str], log_format: str, extra_formats: Sequence[LogFormat] = ()) -> Iterator[LogEvent]:
+    """Lazily parse log lines as `log_format` (or per line for "mixed"), one event at a time"""
+    if log_format == "qdma":
+        parse = parse_qdma_event
+    elif log_format == "legacy":
+        parse = parse_legacy_event
+    elif log_format == MIXED_FORMAT:
+        formats = registered_formats(extra_formats)
+
+        def parse(line: str) -> Optional[LogEvent]:
+            return classify_line(line, formats)[1]
+    else:
+        parse = {f.name: f for f in registered_formats(extra_formats)}[log_format].parse
+    for line in log_lines:
+        event = parse(line)
+        if event is not None:
+            yield event
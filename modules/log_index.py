@@ -0,0 +1,138 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+INDEXED_COLUMNS = ('function', 'module', 'action', 'thread_id', 'source')
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _intersect_sorted(small: np.ndarray, large: np.ndarray) -> np.ndarray:
+    """Intersect two sorted unique index arrays by binary-searching the smaller one into the larger"""
+    if not len(small) or not len(large):
+        return _EMPTY
+    positions = np.searchsorted(large, small)
+    positions[positions == len(large)] = len(large) - 1
+    return small[large[positions] == small]
+
+
+class EventIndex:
+    """Inverted index over an event table: sorted event-index posting lists per column value"""
+
+    def __init__(self, size: int, postings: Dict[str, Dict[Any, np.ndarray]], missing: Dict[str, np.ndarray]):
+        self.size = size
+        self.postings = postings
+        # Rows with no value in a column (e.g. events without a thread ID)
+        self.missing = missing
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "EventIndex":
+        """Build posting lists from the categorical codes with one stable sort per column"""
+        postings = {}
+        missing = {}
+        for column in INDEXED_COLUMNS:
+            categories = frame[column].cat.categories
+            codes = frame[column].cat.codes.to_numpy()
+            # A stable sort groups rows by code while keeping each group in event order
+            order = np.argsort(codes, kind='stable').astype(np.int64, copy=False)
+            counts = np.bincount(codes.astype(np.int64) + 1, minlength=len(categories) + 1)
+            groups = np.split(order, np.cumsum(counts)[:-1])
+            missing[column] = groups[0]
+            postings[column] = dict(zip(categories.tolist(), groups[1:]))
+        return cls(len(frame), postings, missing)
+
+    def values(self, column: str) -> List[Any]:
+        return list(self.postings[column])
+
+    def lookup(self, column: str, selected: Sequence, keep_missing: bool = False) -> Optional[np.ndarray]:
+        """Union of the posting lists for `selected`; None when the selection does not restrict the column"""
+        column_postings = self.postings[column]
+        wanted = set(selected)
+        if wanted.issuperset(column_postings) and (keep_missing or not len(self.missing[column])):
+            return None
+        lists = [column_postings[value] for value in wanted if value in column_postings]
+        if keep_missing:
+            lists.append(self.missing[column])
+        if not lists:
+            return _EMPTY
+        if len(lists) == 1:
+            return lists[0]
+        # Posting lists of distinct values are disjoint, so a sort of the concatenation is their union
+        return np.sort(np.concatenate(lists))
+
+    def select(self,
+               functions: Optional[List[str]] = None,
+               modules: Optional[List[str]] = None,
+               actions: Optional[List[str]] = None,
+               threads: Optional[List[int]] = None,
+               sources: Optional[List[str]] = None) -> np.ndarray:
+        """Sorted indices of events matching every non-empty selection (events without a thread ID pass the thread filter)"""
+        candidates = []
+        for column, selected, keep_missing in (('function', functions, False),
+                                               ('module', modules, False),
+                                               ('action', actions, False),
+                                               ('thread_id', threads, True),
+                                               ('source', sources, False)):
+            if selected:
+                matched = self.lookup(column, selected, keep_missing)
+                if matched is not None:
+                    candidates.append(matched)
+        if not candidates:
+            return np.arange(self.size, dtype=np.int64)
+        candidates.sort(key=len)
+        result = candidates[0]
+        for other in candidates[1:]:
+            result = _intersect_sorted(result, other)
+        return result
+
+
+class TimeIndex:
+    """Timestamps in ascending order, for binary-searched time-window selection"""
+
+    def __init__(self, timestamps: np.ndarray, order: Optional[np.ndarray] = None):
+        # Sorted timestamps; `order` maps sorted positions back to event indices (None when already in order)
+        self.timestamps = timestamps
+        self.order = order
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "TimeIndex":
+        """Use the timestamp column as-is when it is non-decreasing (the usual case), else sort it once"""
+        timestamps = frame['timestamp'].to_numpy(dtype=np.float64)
+        if len(timestamps) < 2 or bool(np.all(timestamps[1:] >= timestamps[:-1])):
+            return cls(timestamps)
+        # Per-CPU buffers can interleave slightly out of order
+        order = np.argsort(timestamps, kind='stable').astype(np.int64, copy=False)
+        return cls(timestamps[order], order)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def bounds(self) -> Tuple[float, float]:
+        if not len(self.timestamps):
+            return 0.0, 0.0
+        return float(self.timestamps[0]), float(self.timestamps[-1])
+
+    def _positions(self, start: float, end: float) -> Tuple[int, int]:
+        """Sorted-array slice [lo, hi) covering start <= timestamp <= end"""
+        lo = int(np.searchsorted(self.timestamps, start, side='left'))
+        hi = int(np.searchsorted(self.timestamps, end, side='right'))
+        return lo, max(lo, hi)
+
+    def window(self, start: float, end: float) -> np.ndarray:
+        """Sorted indices of events with start <= timestamp <= end"""
+        lo, hi = self._positions(start, end)
+        if self.order is None:
+            return np.arange(lo, hi, dtype=np.int64)
+        return np.sort(self.order[lo:hi])
+
+    def restrict(self, rows: np.ndarray, start: float, end: float) -> np.ndarray:
+        """Keep the sorted event indices in `rows` that fall inside the time window"""
+        lo, hi = self._positions(start, end)
+        if lo == 0 and hi == len(self.timestamps):
+            return rows
+        if self.order is None:
+            # Event index == sorted position, so the window is one contiguous index range
+            return rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+        return _intersect_sorted(rows, self.window(start, end))
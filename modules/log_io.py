@@ -0,0 +1,196 @@
+import codecs
+import gzip
+import lzma
+import mmap
+import os
+from itertools import chain, islice
+from typing import BinaryIO, Callable, Iterator, List, Optional, Tuple
+
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+
+def iter_log_lines(stream: BinaryIO,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   encoding: str = 'utf-8',
+                   errors: str = 'replace') -> Iterator[str]:
+    """Decode a binary stream chunk by chunk and yield its lines without line terminators.
+
+    Only one chunk plus one partial line is held at a time. Invalid bytes are handled by
+    `errors` (replaced with U+FFFD by default) instead of raising UnicodeDecodeError.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    pending = ''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        text = pending + decoder.decode(chunk)
+        # Cut after the last '\n' so a '\r\n' pair is never split across chunks
+        cut = text.rfind('\n') + 1
+        if cut:
+            yield from text[:cut].splitlines()
+        pending = text[cut:]
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield from pending.splitlines()
+
+
+# Leading bytes of each supported container; checked on content, not on the file name
+COMPRESSION_MAGIC = (
+    (b'\x1f\x8b', 'gzip'),
+    (b'\xfd7zXZ\x00', 'xz'),
+    (b'\x28\xb5\x2f\xfd', 'zstd'),
+)
+
+COMPRESSED_EXTENSIONS = ('gz', 'xz', 'zst')
+
+
+def detect_compression(stream: BinaryIO) -> Optional[str]:
+    """Name of the compression format of a seekable binary stream ('gzip', 'xz', 'zstd'), or None"""
+    position = stream.tell()
+    head = stream.read(6)
+    stream.seek(position)
+    for magic, name in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_decompressed(stream: BinaryIO) -> BinaryIO:
+    """Wrap a compressed stream in a streaming decompressor; plain streams are returned unchanged.
+
+    Data is inflated chunk by chunk as it is read, so no decompressed copy of the log is kept.
+    zstd support needs the optional `zstandard` package.
+    """
+    compression = detect_compression(stream)
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')
+    if compression == 'xz':
+        return lzma.LZMAFile(stream)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("Reading .zst logs requires the 'zstandard' package (pip install zstandard)")
+        return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+    return stream
+
+
+def iter_log_file_lines(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, encoding: str = 'utf-8',
+                        errors: str = 'replace') -> Iterator[str]:
+    """Lines of a log file on disk, decompressing gzip/xz/zstd files on the fly"""
+    with open(path, 'rb') as handle:
+        yield from iter_log_lines(open_decompressed(handle), chunk_size, encoding, errors)
+
+
+def iter_mmap_lines(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Yield raw byte lines (terminator included) from a memory-mapped file.
+
+    The file is never decoded or read into a Python string as a whole; the OS pages the
+    mapping in and out as lines are consumed. `start`/`end` restrict iteration to a byte range.
+    """
+    with open(path, 'rb') as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return  # mmap cannot map an empty file
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            mapped.seek(start)
+            readline = mapped.readline
+            if end is None:
+                yield from iter(readline, b'')
+                return
+            while mapped.tell() < end:
+                raw = readline()
+                if not raw:
+                    break
+                yield raw
+
+
+class LogTail:
+    """Follow a growing log file by byte offset, returning only complete lines appended since the last poll"""
+
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        self.offset = offset
+        # Bytes after the last newline; completed by a later append
+        self.partial = b''
+        self.truncated = False
+
+    def poll(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[bytes]:
+        """Read from the saved offset to the current end of file and return the new complete lines.
+
+        A file that shrank (rotated or truncated) is followed again from the start, and
+        `truncated` is set so callers can reset any state built from the old contents.
+        """
+        size = os.path.getsize(self.path)
+        self.truncated = size < self.offset
+        if self.truncated:
+            self.offset = 0
+            self.partial = b''
+        if size == self.offset:
+            return []
+        lines: List[bytes] = []
+        with open(self.path, 'rb') as handle:
+            handle.seek(self.offset)
+            remaining = size - self.offset
+            while remaining > 0:
+                chunk = handle.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                self.offset += len(chunk)
+                pieces = (self.partial + chunk).split(b'\n')
+                self.partial = pieces.pop()
+                lines.extend(pieces)
+        return lines
+
+
+DEFAULT_SAMPLE_LINES = 200
+
+
+def sample_stream_lines(stream: BinaryIO,
+                        count: int = DEFAULT_SAMPLE_LINES,
+                        encoding: str = 'utf-8') -> List[str]:
+    """Read about `count` lines spread evenly across a seekable binary stream, then rewind it.
+
+    Each probe seeks to an evenly spaced byte offset, drops the partial line it landed in
+    and keeps the next one, so detection sees the whole file without reading all of it.
+    """
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    lines: List[str] = []
+    seen_offsets = set()
+    for probe in range(count):
+        offset = size * probe // count
+        stream.seek(offset)
+        if offset:
+            stream.readline()  # finish the line the probe landed in
+        start = stream.tell()
+        if start in seen_offsets:
+            continue  # short files: several probes land on the same line
+        seen_offsets.add(start)
+        raw = stream.readline()
+        if raw:
+            lines.append(raw.decode(encoding, 'replace').rstrip('\r\n'))
+    stream.seek(0)
+    return lines
+
+
+def sample_file_lines(path: str, count: int = DEFAULT_SAMPLE_LINES) -> List[str]:
+    """sample_stream_lines for a file on disk"""
+    with open(path, 'rb') as handle:
+        return sample_stream_lines(handle, count)
+
+
+# Compressed logs cannot be sampled by seeking, so their format is detected from this many leading lines
+COMPRESSED_DETECT_LINES = 1000
+
+
+def detect_from_head(log_lines: Iterator[str], detect: Callable[[List[str]], str],
+                     count: int = COMPRESSED_DETECT_LINES) -> Tuple[Iterator[str], str]:
+    """Detect the format of a stream that cannot seek from its leading lines, then put them back in front.
+
+    Returns (the full line iterator, detect(head lines)).
+    """
+    head_lines = list(islice(log_lines, count))
+    return chain(head_lines, log_lines), detect(head_lines)
@@ -0,0 +1,35 @@
+import heapq
+from operator import attrgetter
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from modules.log_events import LogEvent
+from modules.log_formats import LogFormat, MIXED_FORMAT, iter_events
+
+
+def tag_source(events: Iterable[LogEvent], source: str) -> Iterator[LogEvent]:
+    """Stamp each event with the name of the log it came from"""
+    for event in events:
+        event.source = source
+        yield event
+
+
+def merge_event_streams(streams: Iterable[Iterable[LogEvent]]) -> Iterator[LogEvent]:
+    """K-way merge of per-log event streams by timestamp.
+
+    Each stream is consumed lazily, so only one pending event per log sits in the heap;
+    equal timestamps keep the order in which the streams were given.
+    """
+    return heapq.merge(*streams, key=attrgetter('timestamp'))
+
+
+def merged_format(formats: Sequence[str]) -> str:
+    """Format label for a merged log: the shared format, or "mixed" when the logs differ"""
+    distinct = set(formats)
+    return distinct.pop() if len(distinct) == 1 else MIXED_FORMAT
+
+
+def merge_logs(sources: Sequence[Tuple[str, Iterable[str], str]],
+               extra_formats: Sequence[LogFormat] = ()) -> List[LogEvent]:
+    """Parse several logs, given as (source name, lines, format), into one timestamp-ordered event list"""
+    streams = [tag_source(iter_events(lines, log_format, extra_formats), name) for name, lines, log_format in sources]
+    return list(merge_event_streams(streams))
@@ -0,0 +1,61 @@
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from modules.log_events import LogEvent, parse_qdma_events_bytes
+from modules.log_io import iter_mmap_lines
+
+
+DEFAULT_PARALLEL_CHUNK_SIZE = 64 << 20  # 64 MiB of log per task
+
+EventTuple = Tuple[float, str, str, str, str, Optional[int], Optional[str]]
+
+
+def split_line_ranges(path: str, chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE) -> List[Tuple[int, int]]:
+    """Split a file into [start, end) byte ranges of about chunk_size that begin and end on line boundaries"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    ranges = []
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        start = 0
+        while start < size:
+            newline = mapped.find(b'\n', min(start + chunk_size, size) - 1)
+            end = size if newline == -1 else newline + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _parse_range(task: Tuple[str, int, int]) -> List[EventTuple]:
+    """Worker: parse one byte range and return plain tuples, which pickle far smaller than objects"""
+    path, start, end = task
+    return [(e.timestamp, e.module, e.caller_func, e.function, e.action, e.thread_id, e.message)
+            for e in parse_qdma_events_bytes(iter_mmap_lines(path, start, end))]
+
+
+def parse_qdma_file_parallel(path: str,
+                             workers: Optional[int] = None,
+                             chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE) -> List[LogEvent]:
+    """Parse a QDMA log on disk across a process pool; events come back in file order"""
+    ranges = split_line_ranges(path, chunk_size)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(ranges) <= 1:
+        return parse_qdma_events_bytes(iter_mmap_lines(path))
+
+    tasks = [(path, start, end) for start, end in ranges]
+    names = {}
+    events = []
+    append = events.append
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        # map() yields results in submission order, so partial lists merge back in file order
+        for batch in executor.map(_parse_range, tasks):
+            for ts, module, caller_func, function, action, thread_id, message in batch:
+                # Unpickled strings are fresh copies; re-intern them through one shared table
+                module = names.setdefault(module, module)
+                caller_func = names.setdefault(caller_func, caller_func)
+                function = names.setdefault(function, function)
+                action = names.setdefault(action, action)
+                append(LogEvent(ts, module, caller_func, function, action, thread_id, message))
+    return events
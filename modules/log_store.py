@@ -0,0 +1,104 @@
+from typing import BinaryIO, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from modules.log_events import LogEvent
+from modules.log_table import EVENT_COLUMNS
+
+
+STORE_PARQUET = 'parquet'
+STORE_ARROW = 'arrow'
+
+STORE_EXTENSIONS = ('parquet', 'arrow', 'feather')
+
+# Leading bytes of a Parquet file and of an Arrow IPC (Feather v2) file
+_PARQUET_MAGIC = b'PAR1'
+_ARROW_MAGIC = b'ARROW1'
+
+_CATEGORY_COLUMNS = ('module', 'caller_func', 'function', 'action', 'thread_id', 'source')
+
+# Schema metadata key holding the detected log format, so a reload needs no detection either
+_FORMAT_KEY = b'log_visualizer.log_format'
+
+
+def store_kind(stream: BinaryIO) -> Optional[str]:
+    """'parquet' or 'arrow' when a seekable stream holds a saved event table, else None"""
+    position = stream.tell()
+    head = stream.read(6)
+    stream.seek(position)
+    if head.startswith(_PARQUET_MAGIC):
+        return STORE_PARQUET
+    if head.startswith(_ARROW_MAGIC):
+        return STORE_ARROW
+    return None
+
+
+def save_event_table(frame: pd.DataFrame, sink: Union[str, BinaryIO], log_format: str,
+                     kind: str = STORE_PARQUET) -> None:
+    """Write an event table (see events_to_frame) as Parquet or an Arrow IPC file.
+
+    Categorical columns are stored dictionary-encoded and come back as categoricals.
+    """
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _FORMAT_KEY: log_format.encode()})
+    if kind == STORE_PARQUET:
+        pq.write_table(table, sink, compression='zstd')
+    elif kind == STORE_ARROW:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise ValueError(f"Unknown event table format: {kind}")
+
+
+def load_event_table(source: Union[str, BinaryIO]) -> Tuple[pd.DataFrame, str]:
+    """Read a saved event table and the log format it was parsed as"""
+    if isinstance(source, str):
+        with open(source, 'rb') as handle:
+            kind = store_kind(handle)
+    else:
+        kind = store_kind(source)
+    if kind == STORE_PARQUET:
+        table = pq.read_table(source, memory_map=isinstance(source, str))
+    elif kind == STORE_ARROW:
+        table = (ipc.open_file(pa.memory_map(source)) if isinstance(source, str) else ipc.open_file(source)).read_all()
+    else:
+        raise ValueError("Not a saved event table (expected Parquet or Arrow IPC)")
+    log_format = (table.schema.metadata or {}).get(_FORMAT_KEY, b'qdma').decode()
+    frame = table.to_pandas()
+    for column in EVENT_COLUMNS:
+        if column not in frame:
+            frame[column] = pd.Categorical([None] * len(frame))  # tables saved before the column existed
+        elif column in _CATEGORY_COLUMNS and not isinstance(frame[column].dtype, pd.CategoricalDtype):
+            # Nullable integer and all-null columns come back as float64; restore the categorical layout
+            frame[column] = _float_to_category(frame[column].to_numpy(dtype=np.float64))
+    frame['message'] = pd.Series(frame['message'].astype(object), dtype=object).where(frame['message'].notna(), None)
+    return frame[list(EVENT_COLUMNS)], log_format
+
+
+def _float_to_category(values: np.ndarray) -> pd.Categorical:
+    """Categorical of integer categories from a float column where NaN marks a missing value"""
+    present = ~np.isnan(values)
+    categories, inverse = np.unique(values[present], return_inverse=True)
+    codes = np.full(len(values), -1, dtype=np.int64)
+    codes[present] = inverse
+    # An all-missing column keeps empty float categories, as events_to_frame builds it
+    return pd.Categorical.from_codes(codes, categories=categories.astype(np.int64) if len(categories) else categories)
+
+
+def _column_values(column: pd.Series) -> list:
+    """Python values of a column; categoricals are expanded through their codes with missing as None"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        lookup = column.cat.categories.tolist() + [None]  # code -1 (missing) picks the trailing None
+        return [lookup[code] for code in column.cat.codes.tolist()]
+    return column.tolist()
+
+
+def frame_to_events(frame: pd.DataFrame) -> List[LogEvent]:
+    """Rebuild LogEvent records from an event table without touching the original log"""
+    timestamps = frame['timestamp'].tolist()
+    columns = [_column_values(frame[name]) for name in EVENT_COLUMNS[1:]]
+    return [LogEvent(ts, *fields) for ts, *fields in zip(timestamps, *columns)]
@@ -0,0 +1,35 @@
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from modules.log_events import LogEvent
+
+
+EVENT_COLUMNS = ('timestamp', 'module', 'caller_func', 'function', 'action', 'thread_id', 'message', 'source')
+
+
+def events_to_frame(events: Sequence[LogEvent]) -> pd.DataFrame:
+    """Build a columnar event table: categorical names/actions/threads and a float64 timestamp column"""
+    count = len(events)
+    return pd.DataFrame({
+        'timestamp': np.fromiter((e.timestamp for e in events), dtype=np.float64, count=count),
+        'module': pd.Categorical([e.module for e in events]),
+        'caller_func': pd.Categorical([e.caller_func for e in events]),
+        'function': pd.Categorical([e.function for e in events]),
+        'action': pd.Categorical([e.action for e in events]),
+        'thread_id': pd.Categorical([e.thread_id for e in events]),
+        'message': pd.Series([e.message for e in events], dtype=object),
+        'source': pd.Categorical([e.source for e in events]),
+    }, columns=list(EVENT_COLUMNS))
+
+
+def frame_filter_options(frame: pd.DataFrame) -> Dict[str, list]:
+    """Distinct non-empty values of each filterable column, read from the categories"""
+    options = {}
+    for key, column in (('functions', 'function'), ('modules', 'module'), ('actions', 'action'),
+                        ('threads', 'thread_id'), ('sources', 'source')):
+        values = frame[column].cat.categories.tolist()
+        options[key] = [value for value in values if value != '']
+    return options
+
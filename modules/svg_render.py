@@ -0,0 +1,235 @@
+from typing import Dict, List, Tuple
+from xml.sax.saxutils import escape
+
+from modules.log_diagrams import ActivityDiagram, ComponentDiagram, SequenceDiagram
+
+
+# Layout constants (pixels). Text width is estimated from a fixed per-character advance,
+# which is good enough for the monospace font used below and avoids any font metrics lookup.
+FONT = "font-family=\"monospace\" font-size=\"12\""
+CHAR_WIDTH = 7.2
+ROW_HEIGHT = 24
+MARGIN = 20
+NOTE_MAX_CHARS = 60
+
+_DEFS = (
+    '<defs>'
+    '<marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="8" markerHeight="8" orient="auto-start-reverse">'
+    '<path d="M 0 0 L 10 5 L 0 10 z" fill="#333"/></marker>'
+    '</defs>'
+)
+
+
+def _text_width(text: str) -> float:
+    return len(text) * CHAR_WIDTH
+
+
+def _clip(text: str, limit: int = NOTE_MAX_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+def _svg_document(width: float, height: float, body: List[str]) -> str:
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}" height="{height:.0f}" '
+        f'viewBox="0 0 {width:.0f} {height:.0f}">'
+        + _DEFS
+        + f'<rect width="100%" height="100%" fill="white"/>'
+        + "".join(body)
+        + '</svg>'
+    )
+
+
+def _title(body: List[str], title: str, width: float) -> float:
+    """Draw the diagram title and return the y offset below it"""
+    if not title:
+        return MARGIN
+    body.append(f'<text x="{width / 2:.1f}" y="{MARGIN + 12}" text-anchor="middle" {FONT} font-weight="bold">{escape(title)}</text>')
+    return MARGIN + 30
+
+
+def render_sequence_svg(diagram: SequenceDiagram) -> str:
+    """Render a sequence diagram model to SVG: participant boxes, lifelines, messages, notes and loop frames"""
+    participants = diagram.participants()
+    column_width = max([120.0] + [_text_width(name) + 40 for name in participants])
+    x_of: Dict[str, float] = {name: MARGIN + column_width * (i + 0.5) for i, name in enumerate(participants)}
+    width = MARGIN * 2 + column_width * max(len(participants), 1) + NOTE_MAX_CHARS * CHAR_WIDTH
+
+    body: List[str] = []
+    top = _title(body, diagram.title or "", width)
+    header_height = 30
+    bottom = _draw_sequence_steps(diagram.steps, body, x_of, top + header_height + ROW_HEIGHT, 0)
+
+    lifelines = []
+    for name in participants:
+        x = x_of[name]
+        box_width = _text_width(name) + 20
+        lifelines.append(f'<line x1="{x:.1f}" y1="{top + header_height}" x2="{x:.1f}" y2="{bottom}" stroke="#a80036" stroke-dasharray="6,4"/>')
+        lifelines.append(f'<rect x="{x - box_width / 2:.1f}" y="{top}" width="{box_width:.1f}" height="{header_height}" rx="3" fill="#fefece" stroke="#a80036"/>')
+        lifelines.append(f'<text x="{x:.1f}" y="{top + 19}" text-anchor="middle" {FONT}>{escape(name)}</text>')
+    # Lifelines go first so messages are drawn on top of them
+    return _svg_document(width, bottom + MARGIN, lifelines + body)
+
+
+def _draw_sequence_steps(steps: List[tuple], body: List[str], x_of: Dict[str, float], y: float, depth: int) -> float:
+    """Draw one row per step starting at y and return the y after the last row"""
+    for step in steps:
+        kind = step[0]
+        if kind == 'participant':
+            continue
+        if kind in ('call', 'return'):
+            x1, x2, label = x_of[step[1]], x_of[step[2]], step[3]
+            dash = ' stroke-dasharray="5,4"' if kind == 'return' else ''
+            if x1 == x2:  # self message: small loop to the right
+                body.append(f'<path d="M {x1:.1f} {y - 6} h 30 v 12 h -30" fill="none" stroke="#333"{dash} marker-end="url(#arrow)"/>')
+                body.append(f'<text x="{x1 + 36:.1f}" y="{y - 8}" {FONT}>{escape(label)}</text>')
+            else:
+                body.append(f'<line x1="{x1:.1f}" y1="{y}" x2="{x2:.1f}" y2="{y}" stroke="#333"{dash} marker-end="url(#arrow)"/>')
+                body.append(f'<text x="{(x1 + x2) / 2:.1f}" y="{y - 4}" text-anchor="middle" {FONT}>{escape(label)}</text>')
+        elif kind in ('note_over', 'note_right'):
+            text = _clip(step[2])
+            note_width = _text_width(text) + 12
+            x = x_of[step[1]]
+            left = x - note_width / 2 if kind == 'note_over' else x + 8
+            body.append(f'<rect x="{left:.1f}" y="{y - 14}" width="{note_width:.1f}" height="20" fill="#fbfb77" stroke="#a80036"/>')
+            body.append(f'<text x="{left + 6:.1f}" y="{y}" {FONT}>{escape(text)}</text>')
+        elif kind == 'loop':
+            y = _draw_loop(step, body, x_of, y, depth)
+            continue
+        y += ROW_HEIGHT
+    return y
+
+
+def _draw_loop(step: tuple, body: List[str], x_of: Dict[str, float], y: float, depth: int) -> float:
+    """Draw a 'loop N times' frame around the rows of its body and return the y after it"""
+    _, count, steps = step
+    xs = [x_of[name] for name in _participants_in(steps) if name in x_of] or [MARGIN]
+    inset = 8 * depth
+    left = min(xs) - 50 + inset
+    right = max(xs) + 50 + NOTE_MAX_CHARS * CHAR_WIDTH / 2 - inset
+    label = f"loop {count} times"
+    frame_at = len(body)
+    y_start = y - 16
+    y = _draw_sequence_steps(steps, body, x_of, y + ROW_HEIGHT, depth + 1)
+    # Insert the frame before its body so the messages stay on top of it
+    body.insert(frame_at,
+                f'<rect x="{left:.1f}" y="{y_start}" width="{right - left:.1f}" height="{y - y_start - 10}" fill="none" stroke="#555"/>'
+                f'<path d="M {left:.1f} {y_start} h {_text_width(label) + 16:.1f} v 12 l -6 6 h {-_text_width(label) - 10:.1f} z" fill="#eee" stroke="#555"/>'
+                f'<text x="{left + 6:.1f}" y="{y_start + 13}" {FONT} font-weight="bold">{escape(label)}</text>')
+    return y + 4
+
+
+def _participants_in(steps: List[tuple]) -> List[str]:
+    names = []
+    for step in steps:
+        if step[0] == 'loop':
+            names.extend(_participants_in(step[2]))
+        elif step[0] in ('call', 'return'):
+            names.extend(step[1:3])
+        elif step[0] != 'participant':
+            names.append(step[1])
+    return names
+
+
+def render_activity_svg(diagram: ActivityDiagram) -> str:
+    """Render an activity diagram model to SVG as a vertical flow from start to stop"""
+    actions = [text.replace("\\n", "\n") for kind, text in diagram.steps if kind == 'action']
+    action_width = max([160.0] + [_text_width(line) + 24 for text in actions for line in text.split("\n")])
+    center = MARGIN + action_width / 2
+    width = MARGIN * 3 + action_width + NOTE_MAX_CHARS * CHAR_WIDTH
+
+    body: List[str] = []
+    y = _title(body, diagram.title or "", width)
+    body.append(f'<circle cx="{center:.1f}" cy="{y + 10}" r="10" fill="#222"/>')
+    y += 20
+    last_box: Tuple[float, float] = (y, y)
+
+    for kind, text in diagram.steps:
+        if kind == 'action':
+            lines = text.replace("\\n", "\n").split("\n")
+            box_height = 12 + 16 * len(lines)
+            body.append(f'<line x1="{center:.1f}" y1="{y}" x2="{center:.1f}" y2="{y + 20}" stroke="#a80036" marker-end="url(#arrow)"/>')
+            y += 20
+            body.append(f'<rect x="{center - action_width / 2:.1f}" y="{y}" width="{action_width:.1f}" height="{box_height}" rx="10" fill="#fefece" stroke="#a80036"/>')
+            for i, line in enumerate(lines):
+                body.append(f'<text x="{center:.1f}" y="{y + 20 + 16 * i}" text-anchor="middle" {FONT}>{escape(line)}</text>')
+            last_box = (y, y + box_height)
+            y += box_height
+        else:
+            note = _clip(text)
+            left = center + action_width / 2 + MARGIN
+            note_y = (last_box[0] + last_box[1]) / 2 - 10
+            body.append(f'<rect x="{left:.1f}" y="{note_y:.1f}" width="{_text_width(note) + 12:.1f}" height="20" fill="#fbfb77" stroke="#a80036"/>')
+            body.append(f'<text x="{left + 6:.1f}" y="{note_y + 14:.1f}" {FONT}>{escape(note)}</text>')
+
+    body.append(f'<line x1="{center:.1f}" y1="{y}" x2="{center:.1f}" y2="{y + 20}" stroke="#a80036" marker-end="url(#arrow)"/>')
+    y += 30
+    body.append(f'<circle cx="{center:.1f}" cy="{y}" r="10" fill="none" stroke="#222" stroke-width="2"/>')
+    body.append(f'<circle cx="{center:.1f}" cy="{y}" r="6" fill="#222"/>')
+    return _svg_document(width, y + 10 + MARGIN, body)
+
+
+def render_component_svg(diagram: ComponentDiagram) -> str:
+    """Render a component diagram model to SVG: packages side by side, components stacked inside, counted edges"""
+    packages = sorted(diagram.packages, key=lambda name: (name is not None, name or ""))
+    component_height = 28
+    gap = 16
+    positions: Dict[str, Tuple[float, float, float]] = {}  # name -> (center x, center y, half width)
+
+    body: List[str] = []
+    width_guess = MARGIN
+    for package in packages:
+        names = sorted(diagram.packages[package])
+        width_guess += max([120.0, _text_width(package or "") + 30] + [_text_width(n) + 30 for n in names]) + MARGIN * 2
+    top = _title(body, diagram.title or "", width_guess) + MARGIN
+
+    x = MARGIN
+    bottom = top
+    boxes: List[str] = []
+    for package in packages:
+        names = sorted(diagram.packages[package])
+        inner_width = max([120.0, _text_width(package or "") + 30] + [_text_width(n) + 30 for n in names])
+        package_height = 30 + len(names) * (component_height + gap)
+        if package is not None:
+            boxes.append(f'<rect x="{x:.1f}" y="{top}" width="{inner_width + 20:.1f}" height="{package_height}" fill="#f8f8f8" stroke="#555"/>')
+            boxes.append(f'<text x="{x + 8:.1f}" y="{top + 18}" {FONT} font-weight="bold">{escape(package)}</text>')
+        for i, name in enumerate(names):
+            cy = top + 30 + i * (component_height + gap) + component_height / 2
+            cx = x + 10 + inner_width / 2
+            positions.setdefault(name, (cx, cy, inner_width / 2))
+            boxes.append(f'<rect x="{x + 10:.1f}" y="{cy - component_height / 2:.1f}" width="{inner_width:.1f}" height="{component_height}" rx="4" fill="#fefece" stroke="#a80036"/>')
+            boxes.append(f'<text x="{cx:.1f}" y="{cy + 4:.1f}" text-anchor="middle" {FONT}>{escape(name)}</text>')
+        bottom = max(bottom, top + package_height)
+        x += inner_width + 20 + MARGIN * 2
+
+    edges: List[str] = []
+    for (source, target), count in diagram.edges.items():
+        if source not in positions or target not in positions:
+            continue
+        sx, sy, shalf = positions[source]
+        tx, ty, thalf = positions[target]
+        if source == target:
+            edges.append(f'<path d="M {sx + shalf:.1f} {sy - 6:.1f} c 30 -20 30 32 0 12" fill="none" stroke="#333" marker-end="url(#arrow)"/>')
+            label_x, label_y = sx + shalf + 28, sy
+        else:
+            # Leave and enter on the facing sides; bend through the midpoint so parallel edges stay readable
+            x1 = sx + shalf if tx > sx else sx - shalf if tx < sx else sx
+            x2 = tx - thalf if tx > sx else tx + thalf if tx < sx else tx
+            mx, my = (x1 + x2) / 2, (sy + ty) / 2 - (20 if sx == tx else 0)
+            if sx == tx:
+                x1 = x2 = sx + shalf
+                mx = sx + shalf + 40
+            edges.append(f'<path d="M {x1:.1f} {sy:.1f} Q {mx:.1f} {my:.1f} {x2:.1f} {ty:.1f}" fill="none" stroke="#333" marker-end="url(#arrow)"/>')
+            label_x, label_y = mx, my
+        if count > 1:
+            edges.append(f'<text x="{label_x:.1f}" y="{label_y:.1f}" {FONT} fill="#555">{count}x</text>')
+
+    return _svg_document(max(x, width_guess), bottom + MARGIN * 3, body + boxes + edges)
+
+
+def render_svg(diagram) -> str:
+    """Render any diagram model to SVG"""
+    if isinstance(diagram, SequenceDiagram):
+        return render_sequence_svg(diagram)
+    if isinstance(diagram, ActivityDiagram):
+        return render_activity_svg(diagram)
+    return render_component_svg(diagram)
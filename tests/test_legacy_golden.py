@@ -0,0 +1,39 @@
+from modules.log_diagrams import parse_log_to_puml
+from modules.log_events import classify_legacy_line
+
+
+# Lines whose prefix carries an action word of its own ("INFO:", "error:") before the function
+PREFIXED_LINES = [
+    "INFO: Function bar is completed",
+    "error: Function foo caused error",
+    "Function init is called",
+    "[warn] Function load_config is skipped",
+    "debug: Function init is completed",
+    "plain text line",
+]
+
+PREFIXED_PUML = """@startuml
+participant Caller
+participant bar
+bar-->Caller: completed
+participant foo
+note right of foo: ERROR
+participant init
+Caller->init: called
+participant load_config
+note right of Caller: Skipped load_config
+init-->Caller: completed
+note right of Caller: plain text line
+@enduml"""
+
+
+def test_classify_prefixed_lines():
+    assert classify_legacy_line("INFO: Function bar is completed") == ('bar', 'completed')
+    assert classify_legacy_line("error: Function foo caused error") == ('foo', 'error')
+    assert classify_legacy_line("Retrying Function foo") == ('foo', 'retry')
+    assert classify_legacy_line("step skipped") == ('', 'skipped')
+    assert classify_legacy_line("plain text line") == ('', '')
+
+
+def test_prefixed_sequence_golden():
+    assert parse_log_to_puml(PREFIXED_LINES) == PREFIXED_PUML
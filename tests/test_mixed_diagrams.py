@@ -0,0 +1,57 @@
+from modules.log_diagrams import build_diagram, diagram_to_puml
+from modules.log_formats import MIXED_FORMAT, parse_events
+
+
+# QDMA, legacy and dmesg lines in one log; "usb-storage" is not a valid bare PlantUML name
+MIXED_LINES = [
+    "[100.000100] qdma_pf:qdma_ioctl: ----- QDMA entering the qdma_open function at drivers/qdma.c:10 [Thread ID: 101] -----",
+    "Function init is called",
+    "[  12.500000] usb-storage: device found",
+    "error: Function init caused error",
+    "Function init is completed",
+    "[100.000350] qdma_pf:qdma_open: ----- QDMA exiting the qdma_open function at drivers/qdma.c:20 [Thread ID: 101] -----",
+]
+
+MIXED_SEQUENCE = """@startuml
+title QDMA Driver Function Call Sequence
+participant User
+participant qdma_open
+User->qdma_open: entering
+participant init
+User->init: called
+participant "usb-storage" as usb_storage
+note right of usb_storage: device found...
+note right of init: ERROR
+init-->User: completed
+qdma_open-->User: exiting
+@enduml"""
+
+MIXED_COMPONENT = """@startuml
+title QDMA Driver Component Interaction
+component init
+package qdma_pf {
+  component qdma_open
+}
+package "usb-storage" as usb_storage_2 {
+  component [usb-storage] as usb_storage
+}
+@enduml"""
+
+
+def _diagram(diagram_type):
+    return diagram_to_puml(build_diagram(MIXED_FORMAT, diagram_type, parse_events(MIXED_LINES, MIXED_FORMAT)))
+
+
+def test_mixed_sequence_keeps_legacy_calls():
+    assert _diagram("Sequence Diagram") == MIXED_SEQUENCE
+
+
+def test_mixed_component_names():
+    assert _diagram("Component Diagram") == MIXED_COMPONENT
+
+
+def test_mixed_activity_keeps_legacy_calls():
+    activity = _diagram("Activity Diagram")
+    assert ":Enter init;" in activity
+    assert ":Exit init;" in activity
+    assert "note right: init error" in activity